@@ -2,6 +2,9 @@
 uv pip install agno mcp
 '''
 import asyncio
+import os
+
+import httpx
 from agno.agent import Agent
 from agno.db.sqlite import SqliteDb
 from agno.tools.mcp import MCPTools
@@ -10,9 +13,18 @@ from agno.models.openai import OpenAILike
 API_URL = "https://api.siliconflow.cn/v1"
 API_KEY = "sk-"
 MODEL_NAME="Qwen/Qwen3-8B"
+MCP_URL = "http://127.0.0.1:8080/mcp"
+DEBUG = os.environ.get("AGENT_DEBUG") == "1"  # AGENT_DEBUG=1 打开 agno 调试日志
+
+# HTTP/2 连接复用：并发的 LLM 请求多路复用到同一条连接上（需要 h2，httpx[http2] 已带）
+http_client = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+)
 
 llm = OpenAILike(id=MODEL_NAME, api_key=API_KEY, base_url=API_URL, 
-                extra_body = {"enable_thinking": False})
+                extra_body = {"enable_thinking": False},
+                http_client=http_client)
 
 
 system_prompt = '''
@@ -37,10 +49,9 @@ db = SqliteDb(db_file="tmp/agents.db")
 
 async def main():
     # Connect to your Baidu search MCP server
-    mcp_tools = MCPTools(
-        transport="streamable-http",
-        url="http://127.0.0.1:8080/mcp"
-    )
+    # 整个会话只建一次连接：streamable-http 底层是 httpx 连接池（keep-alive），
+    # 所有工具调用复用同一个 MCP session，无需额外的 aiohttp connector
+    mcp_tools = MCPTools(transport="streamable-http", url=MCP_URL)
     await mcp_tools.connect()
 
     try:
@@ -53,8 +64,8 @@ async def main():
             add_history_to_context=True,
             num_history_runs=3,
             markdown=True,
-            debug_mode=True,
-            debug_level=2,
+            debug_mode=DEBUG,
+            debug_level=2 if DEBUG else 1,
         )
 
         query = "GLM5编程能力如何"
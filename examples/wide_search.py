@@ -1,15 +1,22 @@
 """
+uv pip install agno mcp aiofiles
+
 Wide Research implementation using Agno framework.
 Inspired by https://manus.im/blog/introducing-wide-research
 https://github.com/TencentCloudADP/youtu-agent/blob/main/examples/wide_research/main.py
 """
 
 import asyncio
+import inspect
 import json
+import logging
+import os
 import pathlib
-import traceback
+import threading
 from typing import List, Optional
 
+import aiofiles
+import httpx
 from pydantic import BaseModel, Field
 
 from agno.agent import Agent
@@ -19,16 +26,93 @@ from agno.tools.mcp import MCPTools
 from agno.models.openai import OpenAILike
 # from agno.tools.duckduckgo import DuckDuckGoTools
 
+logger = logging.getLogger(__name__)
+
 API_URL = "https://api.siliconflow.cn/v1"
 API_KEY = "sk-"
 MODEL_NAME="Qwen/Qwen3-8B"
 
-llm = OpenAILike(id=MODEL_NAME, api_key=API_KEY, base_url=API_URL, 
-                extra_body = {"enable_thinking": False})
+# HTTP/2 连接复用：并发 searcher 的 LLM 请求多路复用到同一条连接上
+http_client = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+)
+
+CONCURRENCY = 20         # 同时在跑的子任务数（外层宽松上限）
+LLM_CONCURRENCY = 8      # 同时在飞的 LLM 请求数，避免触发 provider 429
+MCP_CONCURRENCY = 20     # 同时在飞的 MCP 工具调用数
+
+_llm_sem = asyncio.Semaphore(LLM_CONCURRENCY)
+_llm_sync_sem = threading.BoundedSemaphore(LLM_CONCURRENCY)  # 同步 invoke 跑在线程里，用线程信号量
+_mcp_sem = asyncio.Semaphore(MCP_CONCURRENCY)
+
+
+class LimitedOpenAILike(OpenAILike):
+    """OpenAILike + 全局 LLM 并发上限：同步/异步、流式/非流式四个入口都要限。"""
+
+    async def ainvoke(self, *args, **kwargs):
+        async with _llm_sem:
+            return await super().ainvoke(*args, **kwargs)
+
+    async def ainvoke_stream(self, *args, **kwargs):
+        # 流式响应在整个迭代期间都占着连接，信号量要持有到流结束
+        async with _llm_sem:
+            async for chunk in super().ainvoke_stream(*args, **kwargs):
+                yield chunk
+
+    def invoke(self, *args, **kwargs):
+        with _llm_sync_sem:
+            return super().invoke(*args, **kwargs)
+
+    def invoke_stream(self, *args, **kwargs):
+        with _llm_sync_sem:
+            yield from super().invoke_stream(*args, **kwargs)
+
+
+async def mcp_limit_hook(function_name: str, function_call, arguments: dict):
+    """tool hook：按 MCP_CONCURRENCY 限制工具调用并发。"""
+    async with _mcp_sem:
+        result = function_call(**arguments)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
 
+llm = LimitedOpenAILike(id=MODEL_NAME, api_key=API_KEY, base_url=API_URL, 
+                extra_body = {"enable_thinking": False},
+                http_client=http_client)
 
+MCP_URL = "http://127.0.0.1:8080/mcp"
+
+# 全局共享的 MCP 连接：所有 search_wide 调用 / 并发 searcher 复用同一会话。
+# streamable-http 传输底层是 httpx 连接池（keep-alive），复用 session 即复用 TCP/DNS。
+_mcp_tools: Optional[MCPTools] = None
+_mcp_lock = asyncio.Lock()
+
+
+async def get_mcp_tools() -> MCPTools:
+    """懒加载并连接 MCPTools，只建立一次连接。"""
+    global _mcp_tools
+    async with _mcp_lock:
+        if _mcp_tools is None:
+            tools = MCPTools(transport="streamable-http", url=MCP_URL)
+            await tools.connect()
+            _mcp_tools = tools
+    return _mcp_tools
+
+
+async def close_mcp_tools() -> None:
+    """关闭共享的 MCP 连接（幂等）。"""
+    global _mcp_tools
+    async with _mcp_lock:
+        if _mcp_tools is not None:
+            await _mcp_tools.close()
+            _mcp_tools = None
+
+def is_fatal_error(e: Exception) -> bool:
+    """鉴权/权限错误对所有子任务都一样，视为致命错误。"""
+    return getattr(e, "status_code", None) in (401, 403)
 
-CONCURRENCY = 20
 
 # ============================================================
 # Prompts
@@ -76,55 +160,78 @@ async def search_wide(
         output_schema: The desired output format of each subtask as valid JSON Schema.
         output_fn: The file name to save the output in JSONL format, e.g. output.jsonl
     """
-    mcp_tools = MCPTools(
-        transport="streamable-http",
-        url="http://127.0.0.1:8080/mcp"
-    )
-    await mcp_tools.connect()
-    print(f"[WideSearch] Processing {len(subtasks)} subtasks for: {task}")
-    print(f"[WideSearch] Output schema: {json.dumps(output_schema, ensure_ascii=False)}")
-
-    # Build a searcher agent (one instance per subtask via closure)
-    searcher_instructions = SEARCHER_INSTRUCTIONS_TEMPLATE.format(
-        schema=json.dumps(output_schema, ensure_ascii=False)
+    mcp_tools = await get_mcp_tools()
+    logger.debug(f"[WideSearch] Processing {len(subtasks)} subtasks for: {task}")
+    schema_str = json.dumps(output_schema, ensure_ascii=False)
+    logger.debug(f"[WideSearch] Output schema: {schema_str}")
+
+    # Build one searcher agent shared by all subtasks (instructions are identical)
+    searcher_instructions = SEARCHER_INSTRUCTIONS_TEMPLATE.format(schema=schema_str)
+    searcher = Agent(
+        name="Searcher",
+        model=llm,
+        # tools=[DuckDuckGoTools()],
+        tools=[mcp_tools],
+        tool_hooks=[mcp_limit_hook],
+        instructions=searcher_instructions,
+        markdown=False,
     )
 
     semaphore = asyncio.Semaphore(CONCURRENCY)
 
-    async def run_subtask(idx: int, subtask: str) -> str:
+    async def run_subtask(idx: int, subtask: str) -> tuple[int, str]:
+        """返回 (idx, 结果)：as_completed 按完成顺序产出，靠 idx 对回子任务。"""
         async with semaphore:
             try:
-                searcher = Agent(
-                    name=f"Searcher-{idx}",
-                    model=llm,
-                    # tools=[DuckDuckGoTools()],
-                    tools=[mcp_tools],
-                    instructions=searcher_instructions,
-                    markdown=False,
-                )
-                response = await searcher.arun(subtask)
+                # 每个子任务独立 session，避免并发 run 之间串状态
+                response = await searcher.arun(subtask, session_id=f"sub-{idx}")
                 content = response.content
-                print(f"[WideSearch] Subtask {idx} done: {subtask[:60]}...")
-                return content
+                logger.debug(f"[WideSearch] Subtask {idx} done: {subtask[:60]}...")
+                return idx, content
             except Exception as e:
-                traceback.print_exc()
-                return json.dumps({"error": str(e)})
-
-    # Run all subtasks concurrently
-    results = await asyncio.gather(
-        *[run_subtask(i, st) for i, st in enumerate(subtasks)]
-    )
-
-    # Save to JSONL
+                if is_fatal_error(e):
+                    raise  # 鉴权类错误所有子任务都会失败，直接中止整批
+                logger.exception(f"[WideSearch] Subtask {idx} failed: {e}")
+                return idx, json.dumps({"error": str(e)})
+
+    def to_record(idx: int, result) -> str:
+        """一行 JSONL：{..., "idx": idx}。结果是 JSON 对象就展开（idx 以子任务序号为准），
+        否则放进 result 字段。"""
+        raw = str(result).strip()
+        try:
+            obj = json.loads(raw)
+        except ValueError:
+            obj = None
+        record = {**obj, "idx": idx} if isinstance(obj, dict) else {"idx": idx, "result": raw}
+        return json.dumps(record, ensure_ascii=False)
+
+    # Run all subtasks concurrently, streaming each result to JSONL as it completes
     output_path = pathlib.Path(output_fn)
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, "w", encoding="utf-8") as f:
-        for result in results:
-            f.write(str(result) + "\n")
-
-    with open(output_path, "r", encoding="utf-8") as f:
-        content = f.read()
-
+    tasks = [
+        asyncio.create_task(run_subtask(i, st))
+        for i, st in enumerate(subtasks)
+    ]
+    lines: list[tuple[int, str]] = []
+    try:
+        async with aiofiles.open(output_path, "w", encoding="utf-8") as f:
+            # 落盘按完成顺序（流式），每行带 idx 可对回子任务
+            for coro in asyncio.as_completed(tasks):
+                idx, result = await coro
+                line = to_record(idx, result)
+                lines.append((idx, line))
+                await f.write(line + "\n")
+                await f.flush()
+            await asyncio.to_thread(os.fsync, f.fileno())
+    except BaseException:
+        # 致命错误（或外部取消）：取消其余子任务，尽快释放 LLM 并发与连接
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    # 返回给 planner 的内容按子任务顺序排列
+    content = "\n".join(line for _, line in sorted(lines))
     return f"Results saved to {output_path}:\n{content}"
 
 
@@ -165,8 +272,11 @@ async def main():
     wide_research = WideResearch()
     query = input("What would you like to research? ").strip() or TASK
     print(f"Processing task: {query}")
-    result = await wide_research.run_streamed(query)
-    print(f"{'=' * 80}\n{result}\n{'=' * 80}")
+    try:
+        result = await wide_research.run_streamed(query)
+        print(f"{'=' * 80}\n{result}\n{'=' * 80}")
+    finally:
+        await close_mcp_tools()
 
 
 if __name__ == "__main__":
@@ -6,22 +6,110 @@ TODO: 缩略url信息和query信息，可以简化llm参数生成复杂度
 """
 
 import os
-import json
+import asyncio
 import argparse
 from typing import List, Literal
 
 from fastmcp import FastMCP
 from baidu_search import BaiduSearch, CrawlEngine, ContextCompressor
+from baidu_search import AsyncCacheManager, async_cache
+from baidu_search.cache import json_dumps, make_cache_key
 
 
 mcp = FastMCP(name="baidu_search_mcp")
 searcher = BaiduSearch()
 crawl_engine = CrawlEngine()
+compressor = ContextCompressor()  # 全局复用，字符预算按次传入
+
+
+def grep_lines(text: str, keyword: str, n: int) -> str:
+    """返回包含 keyword 的行，凑够 n 字符即停止扫描。"""
+    if not keyword:
+        return text[:n]
+    hits = []
+    total = 0
+    pos = 0
+    while total <= n:
+        i = text.find(keyword, pos)
+        if i < 0:
+            break
+        start = text.rfind("\n", 0, i) + 1
+        end = text.find("\n", i)
+        if end < 0:
+            end = len(text)
+        hits.append(text[start:end])
+        total += end - start + 1
+        pos = end + 1
+    return "\n".join(hits)[:n]
 
 
 def err(msg: str) -> str:
     """统一错误返回 JSON"""
-    return json.dumps({"error": msg}, ensure_ascii=False)
+    return json_dumps({"error": msg})
+
+
+class ToolError(Exception):
+    """工具处理失败，消息会作为 error JSON 返回给调用方（不进缓存）。"""
+
+
+# fetch_content 的处理结果（页面切片 / 压缩文本）单独一个纯内存缓存，条数有上限：
+# 整页原文已由 crawl cache 持久化，这里只省切片和压缩，不往 url cache 里塞大文本
+_content_cache = AsyncCacheManager(default_ttl=86400, max_memory_items=256)
+
+# 各模式实际用到的参数，其余参数不进 key，避免同一结果按无关参数存多份
+_CONTENT_KEY_ARGS = {
+    "head": ("n",),
+    "tail": ("n",),
+    "grep": ("n", "keyword"),
+    "compress": ("n", "query"),
+    "full": ("n", "offset"),
+}
+
+
+def _content_key(url: str, mode: str, **kwargs) -> str:
+    used = _CONTENT_KEY_ARGS.get(mode, tuple(sorted(kwargs)))
+    return f"content:{mode}:{make_cache_key(url, *(kwargs[k] for k in used))}"
+
+
+# 相同参数的重复调用直接命中，并发重复调用只执行一次（single-flight）。
+# 失败通过 ToolError 抛出，不会被缓存。
+@async_cache(cache=_content_cache, key_fn=_content_key)
+async def _fetch_content(
+    url: str, mode: str, n: int, keyword: str, query: str, offset: int,
+) -> str:
+    try:
+        text = await crawl_engine.crawl(url)
+    except Exception as e:
+        raise ToolError(f"crawl_failed: {e}")
+
+    if not text:
+        raise ToolError("empty_page")
+
+    # CrawlEngine.crawl 返回 str；bytes 仅作兜底（errors="ignore" 不会抛异常）
+    if isinstance(text, bytes):
+        text = text.decode("utf-8", "ignore")
+
+    orig_len = len(text)
+
+    try:
+        if mode == "head":
+            result = text[:n]
+        elif mode == "tail":
+            result = text[-n:]
+        elif mode == "grep":
+            result = grep_lines(text, keyword, n)
+        elif mode == "compress":
+            # BM25 压缩是纯 CPU 计算，放到线程池里跑，不卡住其他并发请求
+            result = await asyncio.to_thread(compressor.compress, query, text, max_chars=n)
+        else:  # full
+            result = text[offset:offset + n]
+    except Exception as e:
+        raise ToolError(f"process_failed: {e}")
+
+    data = {"text": result, "orig_len": orig_len, "ret_len": len(result)}
+    if mode == "full" and offset + n < orig_len:
+        data["next_offset"] = offset + n
+    return json_dumps(data)
 
 
 @mcp.tool(name="search_baidu")
@@ -37,6 +125,7 @@ async def search_baidu(query: str, num_results: int = 5) -> List[dict]:
     返回：
         JSON: 搜索结果
     """
+    # 不在工具层再缓存：BaiduSearch 已按 query + num_results 写 search cache
     try:
         return await searcher.search(query, num_results=num_results)
     except Exception as e:
@@ -49,7 +138,8 @@ async def fetch_content(
     mode: Literal["full", "head", "tail", "grep", "compress"] = "full",
     n: int = 1000,
     keyword: str = "",
-    query: str = ""
+    query: str = "",
+    offset: int = 0,
 ) -> str:
     """
     功能：
@@ -66,52 +156,25 @@ async def fetch_content(
         n: 最大返回字符数
         keyword: grep 模式下使用的关键词
         query: compress 模式下使用的查询上下文
+        offset: full 模式下的起始字符位置，配合 next_offset 分段读取长网页
 
     返回：
         JSON 字符串：
         {
             "text": str,       # 返回的文本
             "orig_len": int,   # 原始文本长度
-            "ret_len": int     # 返回文本长度
+            "ret_len": int,    # 返回文本长度
+            "next_offset": int # 仅 full 模式且仍有剩余内容时出现
         }
         如果抓取或处理失败，则返回：
         {"error": "错误信息"}
     """
     try:
-        text = await crawl_engine.crawl(url)
-    except Exception as e:
-        return err(f"crawl_failed: {e}")
-
-    if not text:
-        return err("empty_page")
-
-    if isinstance(text, bytes):
-        try:
-            text = text.decode("utf-8", "ignore")
-        except Exception:
-            return err("decode_failed")
-
-    orig_len = len(text)
-
-    try:
-        if mode == "head":
-            result = text[:n]
-        elif mode == "tail":
-            result = text[-n:]
-        elif mode == "grep":
-            paras = text.split("\n")
-            hits = [p for p in paras if keyword in p]
-            result = "\n".join(hits)[:n]
-        elif mode == "compress":
-            compressor = ContextCompressor(max_chars=n)
-            result = compressor.compress(query=query, context=text)
-        else:  # full
-            result = text[:n]
-    except Exception as e:
-        return err(f"process_failed: {e}")
-
-    data = {"text": result, "orig_len": orig_len, "ret_len": len(result)}
-    return json.dumps(data, ensure_ascii=False)
+        return await _fetch_content(
+            url=url, mode=mode, n=n, keyword=keyword, query=query, offset=offset,
+        )
+    except ToolError as e:
+        return err(str(e))
 
 
 # --- 启动 MCP Server ---
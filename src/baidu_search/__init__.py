@@ -1,12 +1,12 @@
-from .cache import AsyncCacheManager, async_cache, get_search_cache, get_url_cache, get_crawl_cache
+from .cache import AsyncCacheManager, SemanticQueryCache, async_cache, get_search_cache, get_url_cache, get_crawl_cache
 from .core import BaiduSearch, ContentFilter, UrlResolveStatus
 from .crawl import CrawlEngine
-from .compressor import ContextCompressor
+from .compressor import ContextCompressor, RankedContext
 
 __all__ = [
     "BaiduSearch", "ContentFilter", "UrlResolveStatus",
-    "AsyncCacheManager", "async_cache", "get_search_cache", "get_url_cache", "get_crawl_cache",
+    "AsyncCacheManager", "SemanticQueryCache", "async_cache", "get_search_cache", "get_url_cache", "get_crawl_cache",
     "CrawlEngine",
-    "ContextCompressor",
+    "ContextCompressor", "RankedContext",
 ]
 
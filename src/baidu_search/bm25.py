@@ -0,0 +1,95 @@
+"""
+BM25Index - 句级 BM25 打分（NumPy 向量化）
+
+替代 rank_bm25.BM25Okapi：打分公式、IDF 与负 IDF 平滑（epsilon * average_idf）保持一致，
+但把倒排索引存成 SoA/CSR 数组，一次构建后按 query 词只做数组切片 + 向量运算。
+
+布局（按 term 排序的 CSR）：
+- indptr[t]:indptr[t+1] 为 term t 的倒排区间
+- doc_ids[...]: 出现该 term 的句子下标（int32）
+- tfs[...]:     该 term 在对应句子中的词频（float64）
+
+用法：
+    index = BM25Index([["强化", "学习"], ["小车", "倒立摆"]])
+    scores = index.get_scores(["强化", "学习"])
+"""
+
+from collections import Counter
+from typing import Sequence
+
+import numpy as np
+
+
+class BM25Index:
+    """基于 CSR 倒排的 BM25 (Okapi) 打分器。
+
+    Args:
+        corpus: 分词后的句子列表
+        k1: 词频饱和参数，默认 1.5（同 BM25Okapi）
+        b: 长度归一化参数，默认 0.75
+        epsilon: 负 IDF 的平滑系数，默认 0.25
+    """
+
+    def __init__(
+        self,
+        corpus: Sequence[Sequence[str]],
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+    ) -> None:
+        self.k1 = k1
+        self.b = b
+        self.corpus_size = n_docs = len(corpus)
+
+        # 1. token → 局部 id，拍平成一维数组
+        vocab: dict[str, int] = {}
+        flat = [vocab.setdefault(t, len(vocab)) for doc in corpus for t in doc]
+        self.vocab = vocab
+        n_terms = len(vocab)
+
+        doc_lens = np.fromiter((len(doc) for doc in corpus), dtype=np.float64, count=n_docs)
+        self.doc_lens = doc_lens
+        self.avgdl = float(doc_lens.sum()) / n_docs if n_docs else 0.0
+
+        if not flat:
+            self.idf = np.zeros(0)
+            self.indptr = np.zeros(1, dtype=np.int64)
+            self.doc_ids = np.zeros(0, dtype=np.int32)
+            self.tfs = np.zeros(0)
+            self.norm = np.zeros(n_docs)
+            return
+
+        # 2. (term, doc) 对去重计数：np.unique 按 term 再按 doc 排序，直接得到 CSR
+        term_ids = np.asarray(flat, dtype=np.int64)
+        doc_of_token = np.repeat(np.arange(n_docs, dtype=np.int64), doc_lens.astype(np.int64))
+        pairs, tf = np.unique(term_ids * n_docs + doc_of_token, return_counts=True)
+        self.doc_ids = (pairs % n_docs).astype(np.int32)
+        self.tfs = tf.astype(np.float64)
+        df = np.bincount(pairs // n_docs, minlength=n_terms)
+        self.indptr = np.concatenate(([0], np.cumsum(df)))
+
+        # 3. IDF（同 BM25Okapi：负值替换为 epsilon * 平均 IDF）
+        idf = np.log(n_docs - df + 0.5) - np.log(df + 0.5)
+        eps = epsilon * idf.mean()
+        idf[idf < 0] = eps
+        self.idf = idf
+
+        # 4. 长度归一化分母只依赖句长，构建时算一次
+        self.norm = k1 * (1 - b + b * doc_lens / self.avgdl)
+
+    def get_scores(self, query: Sequence[str]) -> np.ndarray:
+        """计算 query 与每个句子的 BM25 分数，返回 shape=(corpus_size,) 的数组。
+
+        query 中重复的词只扫描一次倒排，按出现次数加权；不在语料中的词直接跳过。
+        """
+        scores = np.zeros(self.corpus_size)
+        k1p1 = self.k1 + 1
+        for q, count in Counter(query).items():
+            t = self.vocab.get(q)
+            if t is None:
+                continue
+            lo, hi = self.indptr[t], self.indptr[t + 1]
+            docs = self.doc_ids[lo:hi]
+            tf = self.tfs[lo:hi]
+            scores[docs] += (count * self.idf[t]) * (tf * k1p1 / (tf + self.norm[docs]))
+        return scores
@@ -6,6 +6,7 @@
 2. 手动调用：cache_manager.get(key) / cache_manager.set(key, value)
 
 存储后端：内存 dict（默认） / SQLite（可选持久化）
+SQLite 使用单个 WAL 长连接：读经 asyncio.to_thread、写由后台 writer 攒批，均不阻塞事件循环。
 """
 
 import asyncio
@@ -13,27 +14,95 @@ import functools
 import hashlib
 import json
 import logging
+import pickle
 import sqlite3
+import threading
 import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
 logger = logging.getLogger(__name__)
 
+# ── 可选加速：xxhash / orjson 没装就退化为 hashlib.blake2b / json ──
+_HAS_XXHASH = False
+_HAS_ORJSON = False
+
+try:
+    import xxhash
+    _HAS_XXHASH = True
+except ImportError:
+    pass
+
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:
+    pass
+
+# ── 可选：语义缓存需要 numpy；未传 embed_fn 时用 sentence-transformers 加载默认模型 ──
+_HAS_NUMPY = False
+_HAS_SENTENCE_TRANSFORMERS = False
+
+try:
+    import numpy as np
+    _HAS_NUMPY = True
+except ImportError:
+    pass
+
+try:
+    from sentence_transformers import SentenceTransformer
+    _HAS_SENTENCE_TRANSFORMERS = True
+except ImportError:
+    pass
+
+
+def json_dumps(value: Any) -> str:
+    """序列化为 UTF-8 JSON 字符串（不转义中文），优先用 orjson。"""
+    if _HAS_ORJSON:
+        try:
+            return orjson.dumps(value).decode()
+        except TypeError:
+            pass  # orjson 不支持的类型（如非 str 的 dict key）退回 json
+    return json.dumps(value, ensure_ascii=False)
+
+
+def json_loads(raw: str | bytes) -> Any:
+    """反序列化 JSON，优先用 orjson。"""
+    if _HAS_ORJSON:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
 
 class AsyncCacheManager:
     """异步安全的缓存管理器，支持 TTL + 可选 SQLite 持久化。"""
 
-    def __init__(self, default_ttl: int | None = 3600, db_path: str | Path | None = None):
+    def __init__(self, default_ttl: int | None = 3600, db_path: str | Path | None = None,
+                 flush_interval: float = 0.05, batch_size: int = 256,
+                 max_memory_items: int | None = None):
         """
         Args:
             default_ttl: 默认过期时间（秒），None 表示永不过期
             db_path: SQLite 文件路径，None 则纯内存缓存
+            flush_interval: 后台写入攒批窗口（秒）
+            batch_size: 单个事务最多写入条数
+            max_memory_items: 内存层最多保留条数（LRU 淘汰，SQLite 中仍在），None 表示不限
         """
-        self._memory: dict[str, dict] = {}  # {key: {"value": ..., "ts": ...}}
+        # {key: {"value": ..., "ts": ...}}，按最近访问排序，超出上限淘汰最久未用的
+        self._memory: OrderedDict[str, dict] = OrderedDict()
+        self._max_memory_items = max_memory_items
         self._lock = asyncio.Lock()
         self.default_ttl = default_ttl
         self._db_path = str(db_path) if db_path else None
+        self._conn: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()  # 长连接跨线程共享，串行化 DB 操作
+        # 后台批量写：set 只入队，由 writer 协程攒批后一个事务提交
+        self._flush_interval = flush_interval
+        self._batch_size = batch_size
+        self._write_queue: asyncio.Queue | None = None
+        self._writer_task: asyncio.Task | None = None
+        # single-flight：同 key 的并发 miss 只执行一次，所有调用方等待同一个 Task
+        self._inflight: dict[str, asyncio.Task] = {}
         if self._db_path:
             self._init_db()
 
@@ -46,16 +115,19 @@ class AsyncCacheManager:
         db_file = Path(self._db_path)
         db_file.parent.mkdir(parents=True, exist_ok=True)
 
-        # ── 初始化 SQLite ──────────────────────────────────
-        with sqlite3.connect(self._db_path) as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS cache (
-                    key TEXT PRIMARY KEY,
-                    value TEXT,
-                    timestamp REAL
-                )
-            """)
-            conn.commit()
+        # ── 初始化 SQLite（长连接 + WAL，读写经 to_thread 在线程池执行） ──
+        conn = sqlite3.connect(self._db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                timestamp REAL
+            )
+        """)
+        conn.commit()
+        self._conn = conn
 
     # ── 核心 API ───────────────────────────────────────────
     async def get(self, key: str, ttl: int | None = ...) -> Any | None:
@@ -65,32 +137,47 @@ class AsyncCacheManager:
         # 先查内存
         entry = self._memory.get(key)
         if entry and self._is_valid(entry["ts"], effective_ttl):
+            self._memory.move_to_end(key)
             logger.debug(f"[cache hit/mem] {key[:60]}")
             return entry["value"]
 
         # 再查 SQLite
         if self._db_path:
-            row = self._db_get(key)
+            row = await asyncio.to_thread(self._db_get, key)
             if row and self._is_valid(row[1], effective_ttl):
-                value = json.loads(row[0])
+                value = json_loads(row[0])
                 # 回填内存
-                self._memory[key] = {"value": value, "ts": row[1]}
+                self._remember(key, value, row[1])
                 logger.debug(f"[cache hit/db] {key[:60]}")
                 return value
 
         return None
 
     async def set(self, key: str, value: Any):
-        """写入缓存（内存 + 可选 SQLite）。"""
+        """写入缓存（内存立即生效，SQLite 由后台 writer 批量落盘）。"""
         if value is None:
             return
         async with self._lock:
             ts = time.time()
-            self._memory[key] = {"value": value, "ts": ts}
+            self._remember(key, value, ts)
             if self._db_path:
-                self._db_set(key, value, ts)
+                self._ensure_writer()
+                self._write_queue.put_nowait((key, value, ts))
             logger.debug(f"[cache set] {key[:60]}")
 
+    def _remember(self, key: str, value: Any, ts: float):
+        """写入内存层并标记为最近使用，超出 max_memory_items 时淘汰最久未用的条目。"""
+        self._memory[key] = {"value": value, "ts": ts}
+        self._memory.move_to_end(key)
+        if self._max_memory_items is not None:
+            while len(self._memory) > self._max_memory_items:
+                self._memory.popitem(last=False)
+
+    async def flush(self):
+        """等待所有已入队的写入落盘。"""
+        if self._write_queue is not None and not self._writer_task.done():
+            await self._write_queue.join()
+
     async def clear_expired(self):
         """清理过期条目。"""
         if self.default_ttl is None:
@@ -103,6 +190,50 @@ class AsyncCacheManager:
                 del self._memory[k]
             logger.debug(f"[cache] cleared {len(expired)} expired entries")
 
+    # ── 后台批量写入 ───────────────────────────────────────
+    def _ensure_writer(self):
+        """按当前事件循环懒启动 writer（模块级单例可能跨多个 asyncio.run 使用）。"""
+        loop = asyncio.get_running_loop()
+        task = self._writer_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._write_queue = asyncio.Queue()
+            self._writer_task = loop.create_task(self._writer_loop(self._write_queue))
+
+    async def _writer_loop(self, queue: asyncio.Queue):
+        """攒批：拿到第一条后最多等 flush_interval 或凑满 batch_size，一次提交。
+
+        不用 asyncio.wait_for(queue.get())：它在取消与完成同时发生时会吞掉取消
+        （3.11 及以前），writer 停不下来，asyncio.run 退出时卡在取消任务上。
+        """
+        batch = []
+        try:
+            while True:
+                batch = [await queue.get()]
+                self._drain_into(queue, batch)
+                if len(batch) < self._batch_size:
+                    await asyncio.sleep(self._flush_interval)
+                    self._drain_into(queue, batch)
+                try:
+                    await asyncio.to_thread(self._db_set_many, batch)
+                except Exception as e:
+                    logger.warning(f"[cache] batch write failed: {e}")
+                finally:
+                    for _ in batch:
+                        queue.task_done()
+                    batch = []
+        except asyncio.CancelledError:
+            # 事件循环关闭前把剩余写入同步落盘，避免丢数据
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+            if batch:
+                self._db_set_many(batch)
+            raise
+
+    def _drain_into(self, queue: asyncio.Queue, batch: list):
+        """不等待地从队列取条目补进 batch，直到队列空或凑满 batch_size。"""
+        while len(batch) < self._batch_size and not queue.empty():
+            batch.append(queue.get_nowait())
+
     # ── 内部工具 ───────────────────────────────────────────
     @staticmethod
     def _is_valid(ts: float, ttl: int | None) -> bool:
@@ -111,25 +242,134 @@ class AsyncCacheManager:
         return (time.time() - ts) < ttl
 
     def _db_get(self, key: str):
-        with sqlite3.connect(self._db_path) as conn:
-            row = conn.execute(
+        """同步读（在线程池中调用）。"""
+        with self._db_lock:
+            return self._conn.execute(
                 "SELECT value, timestamp FROM cache WHERE key = ?", (key,)
             ).fetchone()
-            return row
 
-    def _db_set(self, key: str, value: Any, ts: float):
-        with sqlite3.connect(self._db_path) as conn:
-            conn.execute(
+    def _db_set_many(self, items: list[tuple[str, Any, float]]):
+        """同步批量写，一个事务提交（在线程池中调用）。"""
+        rows = [(k, json_dumps(v), ts) for k, v, ts in items]
+        with self._db_lock:
+            self._conn.executemany(
                 "INSERT OR REPLACE INTO cache (key, value, timestamp) VALUES (?, ?, ?)",
-                (key, json.dumps(value, ensure_ascii=False), ts),
+                rows,
             )
-            conn.commit()
+            self._conn.commit()
+
+
+class SemanticQueryCache:
+    """语义 query 缓存：与已缓存 query 的余弦相似度 ≥ threshold 即命中。
+
+    向量归一化后按条做 int8 量化，存成 (max_entries, dim) 矩阵 + 每条一个 scale，
+    占用是 float32 的 1/4。写满后环形覆盖最旧条目。
+    get / set 是同步 CPU 计算（含 embedding），在事件循环里请经 asyncio.to_thread 调用。
+
+    Args:
+        embed_fn: 文本 → 一维向量，不传则用 sentence-transformers 加载 model_name
+        threshold: 命中阈值（余弦相似度），默认 0.92
+        max_entries: 最多缓存条数，默认 200
+        model_name: 默认 embedding 模型
+        ttl: 条目有效期（秒），None 表示永不过期；应与精确缓存的 TTL 一致
+    """
+
+    def __init__(self, embed_fn: Callable[[str], Any] | None = None,
+                 threshold: float = 0.92, max_entries: int = 200,
+                 model_name: str = "BAAI/bge-small-zh-v1.5", ttl: int | None = None):
+        if not _HAS_NUMPY:
+            raise ImportError("SemanticQueryCache 需要 numpy")
+        if embed_fn is None and not _HAS_SENTENCE_TRANSFORMERS:
+            raise ImportError("未传 embed_fn 时需要安装 sentence-transformers")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._embed_fn = embed_fn
+        self._model_name = model_name
+        self._matrix = None                        # (max_entries, dim) int8，首次写入时按维度分配
+        self._scales = np.zeros(max_entries, dtype=np.float32)
+        self._ts = np.zeros(max_entries, dtype=np.float64)   # 每个槽位的写入时间
+        self._tags: list[Any] = [None] * max_entries
+        self._values: list[Any] = [None] * max_entries
+        self._size = 0
+        self._next = 0                              # 下一个写入槽位（环形）
+        self._lock = threading.Lock()
+        # 同一 query 的 get miss 紧接着 set，向量只算一次
+        self._embed = functools.lru_cache(maxsize=256)(self._embed_uncached)
+
+    def _embed_uncached(self, text: str):
+        with self._lock:
+            if self._embed_fn is None:
+                model = SentenceTransformer(self._model_name)
+                self._embed_fn = lambda t: model.encode(t, normalize_embeddings=True)
+        vec = np.asarray(self._embed_fn(text), dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vec))
+        return self._quantize(vec / norm if norm else vec)
+
+    @staticmethod
+    def _quantize(vec):
+        """float 向量 → (int8 向量, scale)，vec ≈ q * scale"""
+        peak = float(np.abs(vec).max()) if vec.size else 0.0
+        scale = peak / 127 if peak else 1.0
+        return np.round(vec / scale).astype(np.int8), scale
+
+    def get(self, query: str, tag: Any = None) -> Any | None:
+        """返回相似度最高且 ≥ threshold 的缓存值；tag 须与写入时一致（如 num_results）。"""
+        if not self._size:
+            return None
+        q, q_scale = self._embed(query)
+        with self._lock:
+            # int8 × int32 → int32 累加，不会溢出；再乘回两侧 scale 得到余弦
+            n = self._size
+            sims = (self._matrix[:n] @ q.astype(np.int32)) * (self._scales[:n] * q_scale)
+            if self.ttl is not None:
+                # 过期条目不参与命中，等环形写入自然覆盖
+                sims[time.time() - self._ts[:n] >= self.ttl] = -np.inf
+            for i in np.argsort(-sims):
+                if sims[i] < self.threshold:
+                    break
+                if self._tags[i] == tag:
+                    logger.debug(f"[cache hit/semantic] {query[:60]} ({sims[i]:.3f})")
+                    return self._values[i]
+        return None
+
+    def set(self, query: str, value: Any, tag: Any = None):
+        if value is None:
+            return
+        q, q_scale = self._embed(query)
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, q.shape[0]), dtype=np.int8)
+            i = self._next
+            self._matrix[i] = q
+            self._scales[i] = q_scale
+            self._ts[i] = time.time()
+            self._tags[i] = tag
+            self._values[i] = value
+            self._next = (i + 1) % self.max_entries
+            self._size = min(self._size + 1, self.max_entries)
+
+    def clear(self):
+        with self._lock:
+            self._size = self._next = 0
+            self._tags = [None] * self.max_entries
+            self._values = [None] * self.max_entries
 
 
 def make_cache_key(*args, **kwargs) -> str:
-    """根据函数参数生成缓存 key（md5）。"""
-    raw = str(args) + str(sorted(kwargs.items()))
-    return hashlib.md5(raw.encode()).hexdigest()
+    """根据函数参数生成缓存 key。
+
+    参数先用 pickle 规范化成 bytes（避免大字符串 str() 再 encode 的拷贝），
+    再用 xxh3_128 哈希；未安装 xxhash 时用 blake2b。
+    """
+    try:
+        raw = pickle.dumps((args, sorted(kwargs.items())), protocol=4)
+    except Exception:
+        # 不可 pickle 的参数退回 str 表示
+        raw = (str(args) + str(sorted(kwargs.items()))).encode()
+    if _HAS_XXHASH:
+        return xxhash.xxh3_128_hexdigest(raw)
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
 
 
 # ── 全局缓存实例（模块级单例） ─────────────────────────────
@@ -144,9 +384,11 @@ _url_cache = AsyncCacheManager(
     db_path=".cache/url.db"
 )
 # 网页抓取级：7d（crawl 代价大，缓存久一些）
+# 网页正文动辄几万字，内存层只留最近 512 页，其余从 SQLite 读
 _crawl_cache = AsyncCacheManager(
     default_ttl=86400 * 7,
-    db_path=".cache/crawl.db"
+    db_path=".cache/crawl.db",
+    max_memory_items=512,
 )
 
 
@@ -172,18 +414,32 @@ def async_cache(cache: AsyncCacheManager | None = None, ttl: int | None = ...,
                 key = f"{func.__name__}:{make_cache_key(*cache_args, **kwargs)}"
 
             # 查缓存
-            effective_ttl = ttl if ttl is not ... else None
-            cached = await _cache.get(key, ttl=effective_ttl)
+            cached = await _cache.get(key, ttl=ttl)  # ... 原样转发，由 cache 取 default_ttl
             if cached is not None:
                 return cached
 
-            # 执行原函数
+            # 同 key 已有请求在飞：等同一个 Task；没有则由本次调用创建。
+            # 原函数跑在独立 Task 里，不属于任何一个调用方：
+            # 发起者被取消不会连累其它等待者（各自 shield），Task 照常跑完并写缓存
+            task = _cache._inflight.get(key)
+            if task is None:
+                task = asyncio.create_task(_call_and_store(key, args, kwargs))
+                _cache._inflight[key] = task
+                task.add_done_callback(functools.partial(_finish, key))
+            return await asyncio.shield(task)
+
+        async def _call_and_store(key, args, kwargs):
             result = await func(*args, **kwargs)
-
-            # 写缓存
             await _cache.set(key, result)
             return result
 
+        def _finish(key, task):
+            # Task 结束时出表；异常标记为已读取，所有等待者都被取消时不告警
+            if _cache._inflight.get(key) is task:
+                del _cache._inflight[key]
+            if not task.cancelled():
+                task.exception()
+
         return wrapper
     return decorator
 
@@ -7,28 +7,62 @@ ContextCompressor - 基于 BM25 的上下文压缩器
 - "simple": 按 。！？.!? 切分，粒度小，干净，适合网页正文
 - "jina":   jina chunker 语义分块，粒度大，保留结构，适合 markdown
 
+两种分词模式：
+- "jieba": jieba 词典分词，词粒度准，较慢
+- "regex": 正则切 CJK 单字 + 相邻字 bigram + 英文/数字词，全在 C 层完成，快
+
 用法：
     comp = ContextCompressor(max_chars=2000, splitter="simple")
     result = comp.compress("鱼刺卡喉咙怎么办", page_text)
+    short = comp.compress("鱼刺卡喉咙怎么办", page_text, max_chars=500)  # 复用分句/分词缓存
+
+    # 扫多个预算：排序只算一次，各预算取前缀
+    ranked = comp.rank("鱼刺卡喉咙怎么办", page_text)
+    texts = [ranked.take(m) for m in (500, 1000, 2000)]
 """
 
+import hashlib
 import re
+import threading
+import zlib
+from collections import OrderedDict
 from functools import lru_cache
 from typing import Literal
 
 import jieba
-from rank_bm25 import BM25Okapi
+import numpy as np
 
+from baidu_search.bm25 import BM25Index
 from baidu_search.jina_chunker import chunk_text_simple
 
-# jieba 初始化：预加载词典 + 并行分词
+# jieba 初始化：预加载词典。
+# 不开 enable_parallel：它按进程池 + IPC 分词，对几十字的句子开销远大于分词本身，
+# 只在 MB 级的大文本批量分词时才划算
 jieba.setLogLevel(jieba.logging.WARNING)
 jieba.initialize()
-jieba.enable_parallel(4)
 
 # 简单正则分句：按中英文句末标点切分，保留标点
 _SIMPLE_SPLIT_RE = re.compile(r'(?<=[。！？.!?\n])')
 
+# compress 结果缓存条数（每个压缩器实例独立）
+_RESULT_CACHE_SIZE = 1024
+
+# 正则分词：英文/数字词 或 单个 CJK 字
+_TOKEN_RE = re.compile(r'[a-zA-Z0-9]+|[\u4e00-\u9fff]')
+
+# 短语命中加分：query 里连续 CJK 片段的 2~4 字 n-gram
+_CJK_RUN_RE = re.compile(r'[\u4e00-\u9fff]{2,}')
+_PHRASE_NGRAM_RANGE = (2, 4)
+
+# 近重复句去重（MinHash + LSH 分桶）：64 个哈希函数 = 16 个 band × 4 行，
+# 字符 3-gram 作 shingle。哈希族 (a*x + b) mod P，P 取 2^31-1 保证 uint64 乘法不溢出
+_SHINGLE_SIZE = 3
+_MINHASH_BANDS, _MINHASH_ROWS = 16, 4
+_MINHASH_PRIME = (1 << 31) - 1
+_minhash_rng = np.random.default_rng(0)
+_MINHASH_A = _minhash_rng.integers(1, _MINHASH_PRIME, _MINHASH_BANDS * _MINHASH_ROWS, dtype=np.uint64)
+_MINHASH_B = _minhash_rng.integers(0, _MINHASH_PRIME, _MINHASH_BANDS * _MINHASH_ROWS, dtype=np.uint64)
+
 # 网页噪声模式
 _NOISE_RE = re.compile(
     r"大家还在搜|相关搜索|为你推荐|猜你喜欢|"
@@ -40,8 +74,52 @@ _NOISE_RE = re.compile(
 
 @lru_cache(maxsize=4096)
 def _tokenize(text: str) -> tuple[str, ...]:
-    """jieba 分词，过滤空白 token。返回 tuple 以支持 lru_cache。"""
-    return tuple(w for w in jieba.cut(text) if w.strip())
+    """jieba 分词，过滤空白 token。返回 tuple 以支持 lru_cache。
+
+    关闭 HMM：BM25 只看词项重叠，不需要未登录词的 Viterbi 新词发现，
+    省掉分词里最慢的一段。
+    """
+    return tuple(w for w in jieba.lcut(text, HMM=False) if not w.isspace())
+
+
+@lru_cache(maxsize=4096)
+def _tokenize_regex(text: str) -> tuple[str, ...]:
+    """正则分词：unigram + 相邻 token 拼成的 bigram（补偿 CJK 单字的词组召回）。"""
+    toks = _TOKEN_RE.findall(text)
+    return tuple(toks) + tuple(a + b for a, b in zip(toks, toks[1:]))
+
+
+@lru_cache(maxsize=256)
+def _phrase_finditer(query: str):
+    """query 中 CJK 片段的 2~4 字 n-gram 合成一条交替正则（finditer 方法），长的优先。
+    query 里没有两字以上的 CJK 片段时返回 None。"""
+    lo, hi = _PHRASE_NGRAM_RANGE
+    grams = {
+        run[i:i + n]
+        for run in _CJK_RUN_RE.findall(query)
+        for n in range(lo, hi + 1)
+        for i in range(len(run) - n + 1)
+    }
+    if not grams:
+        return None
+    return re.compile("|".join(sorted(grams, key=len, reverse=True))).finditer
+
+
+@lru_cache(maxsize=64)
+def _build_index(corpus: tuple[tuple[str, ...], ...]) -> BM25Index:
+    """构建 BM25 索引，带缓存：同一页面被多次压缩（如 title、abstract 各一次）时
+    直接复用倒排与长度归一化分母。"""
+    return BM25Index(corpus)
+
+
+def clear_cache() -> None:
+    """清空模块级的分词 / 分句 / 索引缓存（测试隔离用）"""
+    _tokenize.cache_clear()
+    _tokenize_regex.cache_clear()
+    _phrase_finditer.cache_clear()
+    _build_index.cache_clear()
+    _split_and_filter.cache_clear()
+    _dedup_sentences.cache_clear()
 
 
 def _is_noise(text: str) -> bool:
@@ -64,14 +142,81 @@ def _split_and_filter(
     text: str, min_len: int, splitter: str,
 ) -> tuple[str, ...]:
     """分句 + 过滤噪声和碎片，带缓存。"""
-    print("splitter",splitter)
     chunks = _split_simple(text) if splitter == "simple" else _split_jina(text)
+    # 先用原始长度快速淘汰（strip 后只会更短），再 strip / 跑噪声正则
+    noise_search = _NOISE_RE.search
     return tuple(
         c for c in chunks
-        if len(c.strip()) >= min_len and not _is_noise(c)
+        if len(c) >= min_len and len(c.strip()) >= min_len and not noise_search(c)
     )
 
 
+def _minhash(text: str) -> np.ndarray:
+    """字符 3-gram 的 MinHash 签名，shape=(64,)；不足 3 字的句子整句作一个 shingle。"""
+    n = _SHINGLE_SIZE
+    shingles = {text[i:i + n] for i in range(max(len(text) - n + 1, 1))}
+    x = np.fromiter(
+        (zlib.crc32(s.encode("utf-8", "surrogatepass")) % _MINHASH_PRIME for s in shingles),
+        dtype=np.uint64, count=len(shingles),
+    )
+    return ((_MINHASH_A[:, None] * x + _MINHASH_B[:, None]) % _MINHASH_PRIME).min(axis=1)
+
+
+@lru_cache(maxsize=512)
+def _dedup_sentences(
+    sentences: tuple[str, ...], threshold: float = 0.85,
+) -> tuple[str, ...]:
+    """去掉近重复句（估计 Jaccard ≥ threshold），保留首次出现，顺序不变。
+
+    签名按 band 分桶，只和同桶的已保留句比较签名一致率，不做两两全比较。
+    """
+    buckets: dict[tuple[int, bytes], list[np.ndarray]] = {}
+    kept = []
+    for s in sentences:
+        sig = _minhash(s.strip())
+        keys = [(b, band.tobytes()) for b, band in enumerate(sig.reshape(_MINHASH_BANDS, -1))]
+        if any(
+            (sig == other).mean() >= threshold
+            for key in keys for other in buckets.get(key, ())
+        ):
+            continue
+        kept.append(s)
+        for key in keys:
+            buckets.setdefault(key, []).append(sig)
+    return tuple(kept)
+
+
+class RankedContext:
+    """与预算无关的选句结果：句子按选取优先级排好序，take 按预算取前缀。
+
+    稳定排序下预算越大、选中集合只会在前缀上延长，所以扫多个预算只需排序一次。
+    由 ContextCompressor.rank 构造。
+    """
+
+    def __init__(
+        self,
+        context: str,
+        sentences: list[str] | None = None,
+        order: np.ndarray | None = None,
+        lens: np.ndarray | None = None,
+    ) -> None:
+        self.context = context
+        # sentences 为 None：query 或原文为空，take 原样返回原文（同 compress）
+        self.sentences = sentences
+        self.order = order
+        self._cum = lens[order].cumsum() if order is not None else None
+
+    def take(self, max_chars: int) -> str:
+        """取预算内的句子，按原文顺序拼接，长度不超过 max_chars（第一句超长也至少保留一句）"""
+        if self.sentences is None or len(self.context) <= max_chars:
+            return self.context
+        if not self.sentences:
+            return self.context[:max_chars]
+        k = int(np.searchsorted(self._cum, max_chars, side="right")) or 1
+        selected = np.sort(self.order[:k]).tolist()
+        return "".join(self.sentences[i] for i in selected)
+
+
 class ContextCompressor:
     """基于 BM25 的上下文压缩器。
 
@@ -80,6 +225,14 @@ class ContextCompressor:
         max_input_chars: 输入文本截断长度，防止超长文本，默认 50000
         min_sentence_len: 最短句子长度，过滤碎片，默认 10
         splitter: 分句模式，"simple"(默认) 或 "jina"
+        tokenizer: 分词模式，"jieba"(默认) 或 "regex"
+        dedup: 打分前去掉近重复句（MinHash），默认 False。
+            多条搜索结果拼接的文本里同一句话常重复出现，去重后同样预算能放下更多信息
+        mmr_lambda: MMR 冗余惩罚系数，默认 0（纯 BM25 选句）。
+            > 0 时按 相关度 − λ·与已选句的最大相似度 贪心选句，常用 0.5
+        phrase_weight: 短语命中加分系数，默认 0（不加分）。
+            > 0 时每命中一次 query 的 2~4 字 CJK 片段，句子分数加 phrase_weight，
+            弥补分词把长短语切碎后 BM25 的漏召
     """
 
     def __init__(
@@ -88,66 +241,200 @@ class ContextCompressor:
         max_input_chars: int = 50000,
         min_sentence_len: int = 10,
         splitter: Literal["simple", "jina"] = "simple",
+        tokenizer: Literal["jieba", "regex"] = "jieba",
+        dedup: bool = False,
+        mmr_lambda: float = 0.0,
+        phrase_weight: float = 0.0,
     ) -> None:
         self.max_chars = max_chars
         self.max_input_chars = max_input_chars
         self.min_sentence_len = min_sentence_len
         self.splitter = splitter
-
-    def compress(self, query: str, context: str) -> str:
+        self.tokenizer = tokenizer
+        self.dedup = dedup
+        self.mmr_lambda = mmr_lambda
+        self.phrase_weight = phrase_weight
+        self._tokenize = _tokenize_regex if tokenizer == "regex" else _tokenize
+        # (query, 原文 blake2b 摘要, max_chars) → 压缩结果；只存 16 字节摘要，不持有整页原文。
+        # compress 会被 to_thread 并发调用，读写都在锁内
+        self._results: OrderedDict[tuple[str, bytes, int], str] = OrderedDict()
+        self._results_lock = threading.Lock()
+
+    def compress(self, query: str, context: str, max_chars: int | None = None) -> str:
         """压缩上下文，返回与 query 最相关的文本片段。
 
         Args:
             query: 搜索查询词（可以是 title + abstract 拼接）
             context: 爬取的网页全文
+            max_chars: 本次调用的字符预算，默认用构造时的 max_chars。
+                同一原文换预算重复压缩时，分句、分词、索引都命中缓存
 
         Returns:
             压缩后的文本，长度不超过 max_chars
         """
+        if max_chars is None:
+            max_chars = self.max_chars
+
         if not context or not query:
             return context or ""
 
         context = context[:self.max_input_chars]
 
-        if len(context) <= self.max_chars:
+        if len(context) <= max_chars:
             return context
 
-        # 1. 分句 + 过滤（带缓存）
-        sentences = list(
-            _split_and_filter(context, self.min_sentence_len, self.splitter)
+        # 同一页面在多个改写 query 下重复出现时直接命中
+        key = (
+            query,
+            hashlib.blake2b(
+                context.encode("utf-8", "surrogatepass"), digest_size=16,
+            ).digest(),
+            max_chars,
         )
+        with self._results_lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                return result
+
+        result = self._rank(query, context, max_chars).take(max_chars)
+        with self._results_lock:
+            self._results[key] = result
+            if len(self._results) > _RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+        return result
+
+    def clear_cache(self) -> None:
+        """清空本实例的结果缓存及模块级缓存（测试隔离用）"""
+        with self._results_lock:
+            self._results.clear()
+        clear_cache()
+
+    def rank(self, query: str, context: str) -> RankedContext:
+        """对原文分句打分并排好选取顺序，不绑定预算。
+
+        同一 (query, context) 要在多个预算下压缩时，rank 一次再多次 take，
+        结果与逐个 compress(query, context, max_chars=m) 一致。
+        """
+        if not context or not query:
+            return RankedContext(context or "")
+        return self._rank(query, context[:self.max_input_chars])
+
+    def _rank(
+        self, query: str, context: str, max_chars: int | None = None,
+    ) -> RankedContext:
+        """分句、打分、排序（不查缓存）。
+
+        max_chars 只用于 MMR 提前停：贪心选到放不下为止，不必排完全部句子；
+        纯 BM25 排序与预算无关。
+        """
+        # 1. 分句 + 过滤（带缓存），可选近重复去重
+        sentences = _split_and_filter(context, self.min_sentence_len, self.splitter)
+        if self.dedup:
+            sentences = _dedup_sentences(sentences)
+        sentences = list(sentences)
         if not sentences:
-            return context[:self.max_chars]
+            return RankedContext(context, sentences)
 
         # 2. BM25 打分
         scores = self._bm25_score(query, sentences)
+        if self.phrase_weight > 0:
+            scores += self.phrase_weight * self._phrase_hits(query, sentences)
 
-        # 3. 按分数排序，贪心选句直到达到 max_chars
-        sorted_indices = sorted(
-            range(len(scores)), key=lambda i: scores[i], reverse=True,
+        lens = np.fromiter(
+            (len(s) for s in sentences), dtype=np.int64, count=len(sentences),
         )
-
-        selected = []
-        total_chars = 0
-        for idx in sorted_indices:
-            sent_len = len(sentences[idx])
-            if total_chars + sent_len > self.max_chars and selected:
+        # 3. 选取顺序：MMR 贪心，或按分数降序（稳定排序，同分保持原文顺序）。
+        #    预算内的句数由 take 用前缀和一次算出
+        if self.mmr_lambda > 0:
+            order = self._select_mmr(sentences, scores, lens, max_chars)
+        else:
+            order = np.argsort(-scores, kind="stable")
+        return RankedContext(context, sentences, order, lens)
+
+    def _select_mmr(
+        self, sentences: list[str], scores: np.ndarray, lens: np.ndarray,
+        max_chars: int | None = None,
+    ) -> np.ndarray:
+        """MMR 贪心选句：每步取 相关度 − λ·max(与已选句的余弦相似度) 最大的句子，
+        放不下即停（第一句超长也至少保留一句）；max_chars 为 None 时排完全部句子。
+
+        相关度是按最大值归一化到 [0, 1] 的 BM25 分；相似度用句子词集合的二值余弦。
+        每选一句只对全部句子做一次向量化的重叠计数，更新 max_sim。
+        """
+        tokenize = self._tokenize
+        vocab: dict[str, int] = {}
+        ids = [
+            np.unique(np.fromiter(
+                (vocab.setdefault(t, len(vocab)) for t in tokenize(s)), dtype=np.int64,
+            ))
+            for s in sentences
+        ]
+        sizes = np.fromiter((len(x) for x in ids), dtype=np.int64, count=len(ids))
+        flat = np.concatenate(ids)
+        ends = sizes.cumsum()
+        starts = ends - sizes
+
+        top = scores.max()
+        rel = scores / top if top > 0 else scores
+        max_sim = np.zeros(len(sentences))
+        available = np.ones(len(sentences), dtype=bool)
+        chosen: list[int] = []
+        used = 0
+        while available.any():
+            # argmax 取第一个最大值：同分按原文顺序，λ→0 时与纯 BM25 选句一致
+            j = int(np.argmax(np.where(available, rel - self.mmr_lambda * max_sim, -np.inf)))
+            if max_chars is not None and chosen and used + lens[j] > max_chars:
                 break
-            selected.append(idx)
-            total_chars += sent_len
-
-        # 4. 恢复原文顺序，拼接
-        selected.sort()
-        return "".join(sentences[i] for i in selected)
+            chosen.append(j)
+            used += lens[j]
+            available[j] = False
+
+            # 每句与句 j 的词重叠数：前缀和上按句区间相减
+            in_j = np.zeros(len(vocab), dtype=bool)
+            in_j[ids[j]] = True
+            hit_cum = np.concatenate(([0], in_j[flat].cumsum()))
+            overlap = hit_cum[ends] - hit_cum[starts]
+            denom = np.sqrt(sizes * sizes[j])
+            sim = np.divide(overlap, denom, out=np.zeros(len(sentences)), where=denom > 0)
+            np.maximum(max_sim, sim, out=max_sim)
+        return np.asarray(chosen, dtype=np.int64)
+
+    @staticmethod
+    def _phrase_hits(query: str, sentences: list[str]) -> np.ndarray:
+        """每个句子命中 query 短语 n-gram 的次数（不重叠计数）。
+
+        句子用换行拼成一条串只扫一遍（n-gram 全是 CJK 字，不会跨过换行），
+        命中位置按各句起点 searchsorted 回到句子下标。
+        """
+        hits = np.zeros(len(sentences))
+        finditer = _phrase_finditer(query)
+        if finditer is None or not sentences:
+            return hits
+        lens = np.fromiter(
+            (len(s) + 1 for s in sentences), dtype=np.int64, count=len(sentences),
+        )
+        starts = np.concatenate(([0], lens.cumsum()[:-1]))
+        pos = np.fromiter(
+            (m.start() for m in finditer("\n".join(sentences))), dtype=np.int64,
+        )
+        if pos.size:
+            hits += np.bincount(
+                np.searchsorted(starts, pos, side="right") - 1, minlength=len(sentences),
+            )
+        return hits
 
-    def _bm25_score(self, query: str, sentences: list[str]) -> list[float]:
-        """计算 query 与每个句子的 BM25 分数"""
-        tokenized_corpus = [list(_tokenize(s)) for s in sentences]
-        tokenized_query = list(_tokenize(query))
+    def _bm25_score(self, query: str, sentences: list[str]) -> np.ndarray:
+        """计算 query 与每个句子的 BM25 分数。
 
-        if not tokenized_corpus or not tokenized_query:
-            return [0.0] * len(sentences)
+        索引建在全部句子上：avgdl 和负 IDF 的平滑项（epsilon * 平均 IDF）
+        都依赖全集的句长与词表，只对含 query 词的子集建索引会改变排序。
+        """
+        tokenize = self._tokenize
+        tokenized_query = tokenize(query)
 
-        bm25 = BM25Okapi(tokenized_corpus)
-        return bm25.get_scores(tokenized_query).tolist()
+        if not sentences or not tokenized_query:
+            return np.zeros(len(sentences))
 
+        bm25 = _build_index(tuple(tokenize(s) for s in sentences))
+        return bm25.get_scores(tokenized_query)
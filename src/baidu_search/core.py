@@ -23,19 +23,75 @@ import logging
 import random
 import time
 from enum import Enum
-from urllib.parse import urlparse
+from pathlib import Path
+from typing import ClassVar
 
 import httpx
 from aiolimiter import AsyncLimiter
-from bs4 import BeautifulSoup
+from lxml import etree
+from lxml import html as lxml_html
 
-from baidu_search.cache import async_cache, get_search_cache, get_url_cache
+from baidu_search.cache import (
+    AsyncCacheManager, SemanticQueryCache, async_cache, get_search_cache, get_url_cache,
+)
 
 logger = logging.getLogger(__name__)
 
 NOISE_PATTERNS  = r"高清视频|在线观看|实时回复|精选笔记|淘宝"
 BANED_SITES = ["www.taobao.com"]
 
+# ── 摘要清洗（模块级预编译） ──
+# 百度图标字体的私有区字符（如 \ue680, \ue67d），translate 一次删掉
+_ICON_FONT_TABLE = dict.fromkeys(range(0xE600, 0xE700))
+# 交互词噪声（如“播报”、“暂停”、“点击查看”）与空白一次扫描：
+# 含空白的一段（连同夹在其中的噪声词）压成一个空格，纯噪声词的一段删掉。
+# 与原先“先删噪声词、再压空白”两遍 re.sub 一致，都只扫一遍：删掉噪声词后拼出的
+# 新噪声词不会再删（如“查看播报更多”→“查看更多”）
+_ABSTRACT_NOISE = r"播报|暂停|查看更多|展开全部"
+_ABSTRACT_SQUEEZE_RE = re.compile(
+    rf"(?P<ws>(?:{_ABSTRACT_NOISE})*\s(?:\s|{_ABSTRACT_NOISE})*)|(?:{_ABSTRACT_NOISE})+"
+)
+
+
+def _squeeze(m: re.Match) -> str:
+    return " " if m.lastgroup else ""
+
+# 验证码拦截页标记（UTF-8 编码）
+_CAPTCHA_MARK = "百度安全验证".encode("utf-8")
+
+# URL 的 netloc 部分（同 urlparse：到第一个 / ? # 为止）
+_NETLOC_RE = re.compile(r"[A-Za-z][A-Za-z0-9+.-]*://([^/?#]*)")
+# 去重用：scheme / netloc / path / query，丢弃 #fragment
+_URL_PARTS_RE = re.compile(r"([A-Za-z][A-Za-z0-9+.-]*)://([^/?#]*)([^?#]*)(\?[^#]*)?")
+
+# 结果页解析器：丢弃注释、不建 id 哈希表，减少 libxml2 建树开销。
+# 显式按 UTF-8 解码（百度固定 UTF-8）：页面缺 <meta charset> 时 libxml2 会退回 Latin-1
+_HTML_PARSER = lxml_html.HTMLParser(
+    encoding="utf-8", remove_comments=True, collect_ids=False,
+)
+
+def _netloc(url: str) -> str:
+    """取 scheme://netloc/... 中的 netloc，比 urlparse 少建一个 ParseResult"""
+    m = _NETLOC_RE.match(url)
+    return m.group(1) if m else ""
+
+def _url_key(url: str) -> tuple[tuple[str, ...], str]:
+    """返回 (去重键, netloc)。
+    去重键忽略 scheme/host 大小写、path 末尾的 / 和 #fragment；
+    query 保留：未解析的百度跳转链接只靠 query 区分。
+    """
+    m = _URL_PARTS_RE.match(url)
+    if not m:
+        return (url,), ""
+    scheme, netloc, path, query = m.groups()
+    return (scheme.lower(), netloc.lower(), path.rstrip("/"), query or ""), netloc
+
+
+def _xp_class(name: str) -> str:
+    """CSS 类选择器 .name 对应的 XPath 谓词"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
 class UrlResolveStatus(str, Enum):
     SKIPPED = "skipped"      # 不需要解析
     RESOLVED = "resolved"    # 成功拿到 Location
@@ -46,31 +102,44 @@ class ContentFilter:
     def __init__(self, banned_sites=None, noise_patterns=None):
         self.banned_sites = banned_sites or []
         self.re_noise = re.compile(noise_patterns) if noise_patterns else None
-
-    def _is_banned_site(self, url: str) -> bool:
-        netloc = urlparse(url).netloc
-        return any(site in netloc for site in self.banned_sites)
+        # 屏蔽站点合成一条交替正则，一次 C 层 search 代替逐个子串判断
+        self.re_banned = (
+            re.compile("|".join(map(re.escape, self.banned_sites)))
+            if self.banned_sites else None
+        )
+
+    def _is_banned_site(self, url: str, netloc: str | None = None) -> bool:
+        """netloc 已解析过时直接传入，省掉再切一次 URL"""
+        if not self.re_banned:
+            return False
+        return bool(self.re_banned.search(_netloc(url) if netloc is None else netloc))
 
     def filter_results(self, results: list[dict], limit: int) -> list[dict]:
         """Filter search results by URL validity, duplicates, banned sites, and noise."""
         res = []
         seen_urls = set()
+        is_banned = self._is_banned_site
+        noise_search = self.re_noise.search if self.re_noise else None
 
         for result in results:
             url = result.get("url") or ""
             title = result.get("title", "")
             abstract = result.get("abstract", "")
 
-            # 合并所有跳过条件
+            if not url.startswith("http"):
+                continue
+            # 规范化后去重：只差末尾 / 或大小写的同一页面视为重复
+            key, netloc = _url_key(url)
+
+            # 合并其余跳过条件
             if (
-                not url.startswith("http") or
-                url in seen_urls or
-                self._is_banned_site(url) or
-                (self.re_noise and (self.re_noise.search(title) or self.re_noise.search(abstract)))
+                key in seen_urls or
+                is_banned(url, netloc) or
+                (noise_search and (noise_search(title) or noise_search(abstract)))
             ):
                 continue
 
-            seen_urls.add(url)
+            seen_urls.add(key)
             result["rank"] = len(res) + 1
             res.append(result)
 
@@ -110,6 +179,26 @@ class BaiduSearch:
         "Referer": "https://www.baidu.com/",
     }
 
+    # 预编译 XPath（lxml 在 C 层求值），替代 BeautifulSoup + soupsieve 逐次解析选择器
+    _XP_CONTAINERS = etree.XPath(f"//*[{_xp_class('c-container')}]")
+    _XP_TITLE = (etree.XPath("(.//h3)[1]"), etree.XPath(f"(.//*[{_xp_class('t')}])[1]"))
+    _XP_LINK = etree.XPath("(.//a)[1]")
+    # 摘要类名按优先级排列：百度最常用的几个内容类名。
+    # 合成一条 XPath 一次遍历取出所有候选，再按优先级挑，不必逐个类名各走一遍子树
+    _ABSTRACT_CLASSES = ("c-abstract", "content-right_8Zs4j", "content-abstract",
+                         "op-se-share-content", "c-span-last")
+    _XP_ABSTRACT = etree.XPath(
+        ".//*[" + " or ".join(_xp_class(c) for c in _ABSTRACT_CLASSES) + "]"
+    )
+    # 兜底子块：原始文本长度 > 20 的 div/span 在 XPath 里先筛掉短块
+    # （strip 只会更短，这里是超集，精确判断留给 Python）
+    _XP_BLOCKS = etree.XPath(".//*[self::div or self::span][string-length(.) > 20]")
+
+    # 进程级共享：同一出口 IP 下所有实例共用 QPS 令牌桶和风控冷却，
+    # 多个实例并行时不会各自把百度的频率预算再打一遍
+    _LIMITERS: ClassVar[dict[tuple[str, float], AsyncLimiter]] = {}
+    _cooldown_until: ClassVar[float] = 0.0
+
     def __init__(self, config: dict = None) -> None:
         self.url = "https://www.baidu.com/s"
         config = config or {}
@@ -118,29 +207,94 @@ class BaiduSearch:
         self.content_filter = ContentFilter(search_banned_sites, search_noise_patterns)
         self.max_results = config.get("max_results", 100)
 
+        # ── query 级缓存 ──
+        # cache_ttl: 结果有效期（秒），不配则用缓存实例的 default_ttl（1h）
+        # cache_dir: 指定时用该目录下独立的 search.db，否则共用全局 search cache
+        self._cache_ttl = config.get("cache_ttl", ...)
+        cache_dir = config.get("cache_dir")
+        self._search_cache = (
+            AsyncCacheManager(db_path=Path(cache_dir).expanduser() / "search.db")
+            if cache_dir else get_search_cache()
+        )
+        # 语义缓存（可选）：配置 semantic_cache_threshold 才启用，近义改写的 query 复用结果。
+        # 需要 numpy + sentence-transformers，或通过 semantic_cache_embed_fn 自带 embedding
+        self._semantic_cache = None
+        if config.get("semantic_cache_threshold") is not None:
+            try:
+                self._semantic_cache = SemanticQueryCache(
+                    embed_fn=config.get("semantic_cache_embed_fn"),
+                    threshold=config["semantic_cache_threshold"],
+                    max_entries=config.get("semantic_cache_size", 200),
+                    # 与精确缓存同一有效期，过期后不再由语义层兜底返回
+                    ttl=(self._search_cache.default_ttl if self._cache_ttl is ...
+                         else self._cache_ttl),
+                )
+            except ImportError as e:
+                logger.warning(f"语义缓存未启用: {e}")
+
         # ── 并发参数（可通过 config["concurrency"] 覆盖） ──
         cc = {**DEFAULT_CONCURRENCY, **config.get("concurrency", {})}
         self._cc = cc
         # 搜索页并发控制
         self._search_sem = asyncio.Semaphore(cc["search_sem"])
-        self._search_qps = self._make_limiter(cc["search_qps"])
+        self._search_qps = self._make_limiter("search", cc["search_qps"])
         # link 解析并发控制
         self._resolve_sem = asyncio.Semaphore(cc["resolve_sem"])
-        self._resolve_qps = self._make_limiter(cc["resolve_qps"])
-        self._cooldown_until = 0
+        self._resolve_qps = self._make_limiter("resolve", cc["resolve_qps"])
         # 是否解析真实url
         self.resolve_real_url = cc.get("resolve_real_url", True)
+        # 复用的 HTTP client（懒创建，绑定到创建时的事件循环）
+        self._client: httpx.AsyncClient | None = None
+        self._client_loop = None
 
-    @staticmethod
-    def _make_limiter(qps: float) -> AsyncLimiter:
-        """构造 AsyncLimiter，确保 max_rate >= 1 以避免 acquire 报错。
+    async def _get_client(self) -> httpx.AsyncClient:
+        """懒创建 httpx.AsyncClient，连接池上限与 sem 配置匹配。
+        事件循环变了（如多次 asyncio.run）则重建，旧连接不能跨循环复用。
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            cc = self._cc
+            self._client = httpx.AsyncClient(
+                headers=self._HEADERS,
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=cc["resolve_sem"] + cc["search_sem"],
+                    max_keepalive_connections=20,
+                    keepalive_expiry=60,
+                ),
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def aclose(self) -> None:
+        """关闭复用的 HTTP client。"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._client_loop = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    @classmethod
+    def _make_limiter(cls, name: str, qps: float) -> AsyncLimiter:
+        """取 (name, qps) 对应的进程级共享 AsyncLimiter，首次调用时创建。
+        确保 max_rate >= 1 以避免 acquire 报错。
         例如 qps=0.33 → AsyncLimiter(1, 1/0.33≈3.03)，即 3 秒 1 次。
         """
-        if qps >= 1:
-            return AsyncLimiter(qps, 1)
-        else:
-            # 反转：1 次 / (1/qps) 秒
-            return AsyncLimiter(1, 1.0 / qps)
+        key = (name, qps)
+        limiter = cls._LIMITERS.get(key)
+        if limiter is None:
+            if qps >= 1:
+                limiter = AsyncLimiter(qps, 1)
+            else:
+                # 反转：1 次 / (1/qps) 秒
+                limiter = AsyncLimiter(1, 1.0 / qps)
+            cls._LIMITERS[key] = limiter
+        return limiter
 
     async def search(self, query: str, num_results: int = 5) -> str:
         """搜索百度并返回结果"""
@@ -170,58 +324,72 @@ class BaiduSearch:
         """
         # ── query 级缓存 ──
         cache_key = f"search:{query}:{num_results}"
-        cached = await get_search_cache().get(cache_key)
+        cached = await self._search_cache.get(cache_key, ttl=self._cache_ttl)
         if cached is not None:
             logger.info(f"[cache hit] search_baidu: {query!r}")
             return cached
 
+        # ── 语义缓存：embedding 是 CPU 计算，放到线程里 ──
+        semantic = self._semantic_cache
+        if semantic is not None:
+            cached = await asyncio.to_thread(semantic.get, query, num_results)
+            if cached is not None:
+                logger.info(f"[cache hit/semantic] search_baidu: {query!r}")
+                return cached
+
         pages_needed = (num_results + 9) // 10
         t0 = time.time()
 
-        # http2=True + 固定 headers 在 client 级别
-        async with httpx.AsyncClient(headers=self._HEADERS, http2=True) as client:
-            t1 = time.time()
-            logger.info(f"[计时] 初始化 {t1-t0:.2f}s")
-
-            # ② 搜索页：gather 并发，sem + qps 自动限速
-            results = await self._fetch_pages_concurrent(client, query, pages_needed)
-            t2 = time.time()
-            logger.info(f"[计时] 搜索页 {pages_needed} 页 → {len(results)} 条，{t2-t1:.2f}s")
-
-            # ③ link 解析：gather 并发，sem + qps 自动限速
-            if self.resolve_real_url:
-                await self._resolve_urls_concurrent(client, results)
-                t3 = time.time()
-                logger.info(f"[计时] URL 解析 {len(results)} 条，{t3-t2:.2f}s")
-            else:
-                # 标记为跳过解析
-                for item in results:
-                    item["url_status"] = UrlResolveStatus.SKIPPED.value
-                t3 = time.time()
-                logger.info(f"[计时] URL 解析已关闭")
-
-            # ④ 降级保留
-            cleaned = [
-                item for item in results
-                if item.get("url_status") != UrlResolveStatus.FAILED.value
-                or item.get("url", "").startswith("http")
-            ]
-            if not cleaned:
-                logger.warning(f"URL 全部解析失败: {query}，返回原始结果")
-                cleaned = results
-
-            logger.info(f"[计时] 总耗时 {t3-t0:.2f}s，返回 {len(cleaned)} 条")
-            result = {"data": cleaned}
-
-            # ── 写入 query 级缓存 ──
-            await get_search_cache().set(cache_key, result)
-            return result
+        # 进程内复用的 client（http2=True + 固定 headers），省掉每次查询的 TLS 握手
+        client = await self._get_client()
+        t1 = time.time()
+        logger.info(f"[计时] 初始化 {t1-t0:.2f}s")
+
+        # ② 搜索页：gather 并发，sem + qps 自动限速
+        results = await self._fetch_pages_concurrent(client, query, pages_needed)
+        t2 = time.time()
+        logger.info(f"[计时] 搜索页 {pages_needed} 页 → {len(results)} 条，{t2-t1:.2f}s")
+
+        # ③ link 解析：gather 并发，sem + qps 自动限速
+        if self.resolve_real_url:
+            await self._resolve_urls_concurrent(client, results)
+            t3 = time.time()
+            logger.info(f"[计时] URL 解析 {len(results)} 条，{t3-t2:.2f}s")
+        else:
+            # 标记为跳过解析
+            for item in results:
+                item["url_status"] = UrlResolveStatus.SKIPPED.value
+            t3 = time.time()
+            logger.info(f"[计时] URL 解析已关闭")
+
+        # ④ 降级保留
+        cleaned = [
+            item for item in results
+            if item.get("url_status") != UrlResolveStatus.FAILED.value
+            or item.get("url", "").startswith("http")
+        ]
+        if not cleaned:
+            logger.warning(f"URL 全部解析失败: {query}，返回原始结果")
+            cleaned = results
+
+        logger.info(f"[计时] 总耗时 {t3-t0:.2f}s，返回 {len(cleaned)} 条")
+        result = {"data": cleaned}
+
+        # ── 写入 query 级缓存 ──
+        await self._search_cache.set(cache_key, result)
+        if semantic is not None:
+            await asyncio.to_thread(semantic.set, query, result, num_results)
+        return result
 
     # ── 搜索页：并发抓取 ─────────────────────────────────────
     async def _fetch_pages_concurrent(self, client, query, pages_needed):
         """所有页 gather 并发，由 sem + qps 自动控制节奏。"""
+        # 同一 query 的各页只差 pn，wd/ie 编码一次，各页只合并 pn
+        base_url = self._search_url(query)
         tasks = [
-            asyncio.create_task(self._fetch_page_throttled(client, query, i))
+            asyncio.create_task(
+                self._fetch_page_throttled(client, query, i, base_url=base_url)
+            )
             for i in range(pages_needed)
         ]
         pages = await asyncio.gather(*tasks)
@@ -232,7 +400,7 @@ class BaiduSearch:
                 results.extend(page)
         return results
 
-    async def _fetch_page_throttled(self, client, query, page_idx):
+    async def _fetch_page_throttled(self, client, query, page_idx, base_url=None):
         """单页请求：抖动 + sem + qps 限速，被拦截时 backoff 重试。"""
         max_retries = self._cc["max_retries"]
         backoff = self._cc["retry_backoff"]
@@ -251,7 +419,9 @@ class BaiduSearch:
             await asyncio.sleep(random.uniform(*jitter))
             async with self._search_qps:
                 async with self._search_sem:
-                    data = await self.fetch_page(client, query, page_idx)
+                    data = await self.fetch_page(
+                        client, query, page_idx, base_url=base_url,
+                    )
             if data is not None:
                 return data
             # 被拦截，backoff 重试
@@ -267,22 +437,43 @@ class BaiduSearch:
 
     # ── link 解析：并发解析 ──────────────────────────────────
     async def _resolve_urls_concurrent(self, client, results):
-        """所有 URL gather 并发，由 sem + qps 自动控制节奏。"""
-        tasks = [
-            asyncio.create_task(self._resolve_one(client, item))
-            for item in results
-        ]
+        """所有 URL gather 并发，由 sem + qps 自动控制节奏。
+        百度跳转链接同属 www.baidu.com，在同一条 H2 连接上多路复用，
+        不再逐条抖动 + sem，只保留 qps 防风控。
+        """
+        tasks = []
+        for item in results:
+            # 直链不建 task：省掉抖动 sleep 和 sem/qps 排队
+            if not self._is_redirect_url(item["url"]):
+                item["url_status"] = UrlResolveStatus.SKIPPED.value
+                continue
+            tasks.append(asyncio.create_task(
+                self._resolve_one(client, item, multiplexed=self._is_baidu_host(item["url"]))
+            ))
         if tasks:
             await asyncio.gather(*tasks)
 
-    async def _resolve_one(self, client, item):
-        """单条 URL 解析：抖动 + sem + qps 限速，不重试。"""
-        jitter = self._cc["resolve_jitter"]
-        # 抖动：让同批 task 错开到达
-        await asyncio.sleep(random.uniform(*jitter))
-        async with self._resolve_qps:
-            async with self._resolve_sem:
+    @staticmethod
+    def _is_baidu_host(url: str) -> bool:
+        return _netloc(url).endswith("baidu.com")
+
+    @staticmethod
+    def _is_redirect_url(url: str) -> bool:
+        """百度跳转链接（需要 HEAD 拿 Location）"""
+        return "link?url=" in url or "baidu.php" in url
+
+    async def _resolve_one(self, client, item, multiplexed=False):
+        """单条 URL 解析：抖动 + sem + qps 限速，不重试。multiplexed=True 时只走 qps。"""
+        if multiplexed:
+            async with self._resolve_qps:
                 url, status = await self.get_real_url(client, item["url"])
+        else:
+            jitter = self._cc["resolve_jitter"]
+            # 抖动：让同批 task 错开到达
+            await asyncio.sleep(random.uniform(*jitter))
+            async with self._resolve_qps:
+                async with self._resolve_sem:
+                    url, status = await self.get_real_url(client, item["url"])
         item["url"] = url
         item["url_status"] = status.value
 
@@ -295,7 +486,7 @@ class BaiduSearch:
             return url, UrlResolveStatus.SKIPPED
 
         # 非跳转 URL 直接跳过
-        if not ("link?url=" in url or "baidu.php" in url):
+        if not self._is_redirect_url(url):
             return url, UrlResolveStatus.SKIPPED
 
         # ── URL 级缓存 ──
@@ -322,81 +513,102 @@ class BaiduSearch:
         """清洗乱码和冗余换行"""
         if not text: return ""
         
-        # 1. 去掉特殊的编码字符（如 \ue680, \ue67d 等百度图标字体）
-        text = re.sub(r'[\ue600-\ue6ff]', '', text)
-        
-        # 2. 将多个换行符、制表符统一替换为单个空格，保持结构紧凑
-        text = re.sub(r'[\n\t\r]+', ' ', text)
+        # 1. 去掉特殊的编码字符（百度图标字体）
+        text = text.translate(_ICON_FONT_TABLE)
         
-        # 3. 去掉纯粹的交互词噪声（如“播报”、“暂停”、“点击查看”）
-        noise = ["播报", "暂停", "查看更多", "展开全部"]
-        for n in noise:
-            text = text.replace(n, "")
-        
-        # 4. 去除首尾及中间多余空格
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text
+        # 2. 去掉交互词噪声，换行/制表符及多余空白统一压成单个空格（一遍），去除首尾空格
+        return _ABSTRACT_SQUEEZE_RE.sub(_squeeze, text).strip()
 
 
     def extract_abstract(self, container):
-        """从容器中提取摘要文本块"""
-        # 尝试百度最常用的几个内容类名
-        selectors = [".c-abstract", ".content-right_8Zs4j", ".content-abstract", ".op-se-share-content",".c-span-last"]
-
-        for s in selectors:
-            node = container.select_one(s)
-            if node: return node.get_text()
+        """从容器（lxml 元素）中提取摘要文本块"""
+        # 候选按文档序返回；取优先级最高的类名里最靠前的一个
+        best_node, best_rank = None, len(self._ABSTRACT_CLASSES)
+        for node in self._XP_ABSTRACT(container):
+            classes = node.get("class", "").split()
+            rank = next(
+                (r for r, c in enumerate(self._ABSTRACT_CLASSES[:best_rank]) if c in classes),
+                best_rank,
+            )
+            if rank < best_rank:
+                best_node, best_rank = node, rank
+                if rank == 0:
+                    break
+        if best_node is not None:
+            return best_node.text_content()
 
         # 兜底：如果找不到指定类，就找包含文本最多的子块
-        child_nodes = container.find_all(["div", "span"])
-        if child_nodes:
-            # 过滤掉字数太少的（比如只有“广告”两个字的）
-            texts = [t.get_text().strip() for t in child_nodes if len(t.get_text().strip()) > 20]
-            if texts:
-                return max(texts, key=len)
-        return ""
-
-    async def fetch_page(self, client, keyword, page_idx):
-        """单页请求（纯逻辑，不含限速）。返回 None 表示被拦截，[] 表示解析异常。"""
-
-        params =    {
-            "wd": keyword,
-            "pn": page_idx * 10,
-            "ie": "utf-8",
-        }
+        # 过滤掉字数太少的（比如只有“广告”两个字的）
+        best = ""
+        for node in self._XP_BLOCKS(container):
+            text = node.text_content().strip()
+            if len(text) > 20 and len(text) > len(best):
+                best = text
+        return best
+
+    def _find_title(self, container):
+        """标题节点：优先 h3，其次 .t"""
+        for xp in self._XP_TITLE:
+            nodes = xp(container)
+            if nodes:
+                return nodes[0]
+        return None
+
+    def _parse_page(self, content, page_idx):
+        """解析结果页 HTML（bytes），返回本页条目列表。在工作线程中执行。"""
+        # 直接喂 bytes 给 lxml，跳过 httpx 的字符集探测
+        tree = lxml_html.fromstring(content, parser=_HTML_PARSER)
+        containers = self._XP_CONTAINERS(tree)
+        
+        page_items = []
+        for i, container in enumerate(containers):
+            title_node = self._find_title(container)
+            if title_node is None: continue
+            
+            title = "".join(t.strip() for t in title_node.itertext())
+            links = self._XP_LINK(title_node)
+            raw_url = links[0].get("href", "") if links else ""
+            
+            # 提取并清洗摘要
+            raw_abstract = self.extract_abstract(container)
+            clean_abs = self.clean_abstract(raw_abstract)
+
+            page_items.append({
+                "rank": page_idx * 10 + i + 1,
+                "title": title,
+                "abstract": clean_abs,
+                "url": raw_url
+            })
+        return page_items
+
+    def _search_url(self, keyword) -> httpx.URL:
+        """搜索页基础 URL（不含 pn），同一 query 的所有页共用"""
+        return httpx.URL(self.url, params={"wd": keyword, "ie": "utf-8"})
+
+    async def fetch_page(self, client, keyword, page_idx, base_url=None):
+        """单页请求（纯逻辑，不含限速）。返回 None 表示被拦截，[] 表示解析异常。
+        base_url 为 _search_url(keyword) 的预构建结果，不传则现场构建。
+        """
+        if base_url is None:
+            base_url = self._search_url(keyword)
+        url = base_url.copy_merge_params({"pn": page_idx * 10})
         try:
-            resp = await client.get(self.url, params=params, timeout=5.0)
+            resp = await client.get(url, timeout=5.0)
 
             # 检测验证码拦截 → 返回 None 触发上层重试
-            if "百度安全验证" in resp.text:
+            # 直接在 bytes 上查（百度固定 UTF-8），不走 resp.text 的解码与字符集探测
+            html_bytes = resp.content
+            if _CAPTCHA_MARK in html_bytes:
                 logger.warning(f"触发百度安全验证，第 {page_idx} 页")
 
-                # 设置全局冷却 30 秒
-                self._cooldown_until = time.time() + 30
+                # 设置全局冷却 30 秒（类属性，所有实例一起退避）
+                BaiduSearch._cooldown_until = max(
+                    BaiduSearch._cooldown_until, time.time() + 30,
+                )
                 return None
 
-            soup = BeautifulSoup(resp.text, "lxml")
-            containers = soup.select(".c-container")
-            
-            page_items = []
-            for i, container in enumerate(containers):
-                title_node = container.select_one("h3") or container.select_one(".t")
-                if not title_node: continue
-                
-                title = title_node.get_text(strip=True)
-                raw_url = title_node.find("a")["href"] if title_node.find("a") else ""
-                
-                # 提取并清洗摘要
-                raw_abstract = self.extract_abstract(container)
-                clean_abs = self.clean_abstract(raw_abstract)
-
-                page_items.append({
-                    "rank": page_idx * 10 + i + 1,
-                    "title": title,
-                    "abstract": clean_abs,
-                    "url": raw_url
-                })
-            return page_items
+            # 解析是纯 CPU（建树 + XPath），放到线程里，事件循环继续收其它响应
+            return await asyncio.to_thread(self._parse_page, html_bytes, page_idx)
         except Exception as e:
             logger.exception(f"fetch_page 异常: {e}")
             return []
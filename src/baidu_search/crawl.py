@@ -11,19 +11,20 @@ CrawlEngine - 统一网页抓取引擎
     text = await engine.crawl(url)
 TODO:
 1 像search一样添加cache √
-2 异步与同步混用改掉
-_crawl_requests 用的是同步 sync_requests.get，但 crawl() 是 async，可能导致线程阻塞。
-
-可以考虑用 httpx.AsyncClient 或 aiohttp 完全异步化。
+2 异步与同步混用改掉 √
+_crawl_requests 改用实例级复用的 httpx.AsyncClient（L0 与 jina 共用连接池）。
 """
 
 import os
 import re
 import time
+import itertools
+import asyncio
 import logging
 from typing import Optional
 
-import requests as sync_requests
+import httpx
+from lxml import html as lxml_html
 
 from baidu_search.cache import get_crawl_cache
 
@@ -31,7 +32,7 @@ logger = logging.getLogger(__name__)
 
 # ── 可用后端探测（按需导入，没装就跳过） ──
 _HAS_CRAWL4AI = False
-_HAS_HTTPX = False
+_HAS_CRAWL4AI_DISPATCHER = False
 _HAS_READABILITY = False
 
 try:
@@ -41,82 +42,132 @@ except ImportError:
     pass
 
 try:
-    import httpx
-    _HAS_HTTPX = True
+    # 新版 crawl4ai 才有批量调度器；旧版退化为同一个浏览器里逐个 arun
+    from crawl4ai import MemoryAdaptiveDispatcher, RateLimiter
+    _HAS_CRAWL4AI_DISPATCHER = True
 except ImportError:
     pass
 
 try:
     from readability import Document as ReadabilityDoc
     from markdownify import markdownify as md_convert
-    from bs4 import BeautifulSoup
     _HAS_READABILITY = True
 except ImportError:
     pass
 
 
+# 正文 HTML 超过 max_chars 的这个倍数时，转 markdown 前先截掉尾部块
+_TRUNCATE_RATIO = 3
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# 整页 HTML 解析器：先统一编码成 UTF-8 bytes 再解析，避免 str 里的 encoding 声明报错
+_UTF8_PARSER = lxml_html.HTMLParser(encoding="utf-8")
+
 # ── 内容质量检测 ──
+_BAD_STATUSES = frozenset({403, 429, 503, 520, 521, 522})
+_MIN_JS_LIMIT = 3  # 两条 JS 判定阈值的下界（密度条件 3 次/百字，且至少按 100 字算）
 _JS_PATTERN = re.compile(
     r'<script[\s>]|function\s*\(|var\s+\w+\s*=|document\.|window\.|'
     r'addEventListener|createElement|innerHTML',
     re.IGNORECASE,
 )
+_TAG_RE = re.compile(r'<[^>]+>')
+
+# ── markdown 结构增强：整篇一次 sub，逐行语义同 strip 后判断 ──
+# 一级标题：一、二、三、 → "## "；二级标题：1、2、 → "### "；
+# 星号列表 "* " 转 "- "（避免乱层级，要求 strip 后仍以 "* " 开头）。
+# 命中的行去掉首尾空白，其余行原样保留
+_HEADING_RE = re.compile(
+    r"^[^\S\n]*"
+    r"(?P<body>(?:(?P<h2>[一二三四五六七八九十]+、)|(?P<h3>\d+、)|\* (?=[^\n]*\S))[^\n]*?)"
+    r"[^\S\n]*$",
+    re.MULTILINE,
+)
 
 
 def _is_bad_content(text: str, status_code: int = 200) -> bool:
     """判断抓取内容是否无效"""
-    if status_code in (403, 503, 429, 520, 521, 522):
+    if status_code in _BAD_STATUSES:
         return True
-    if not text or len(text.strip()) < 50:
+    # 原始长度已不足 50 直接判无效；首尾不是空白时 strip 不改变长度，省掉整页拷贝
+    if not text or len(text) < 50:
         return True
-    js_hits = len(_JS_PATTERN.findall(text))
-    plain = re.sub(r'<[^>]+>', '', text).strip()
-    if len(plain) < 100 and js_hits > 5:
+    if (text[0].isspace() or text[-1].isspace()) and len(text.strip()) < 50:
         return True
-    if len(plain) > 0 and js_hits / max(len(plain) / 100, 1) > 3:
+    # 判定条件：纯文本 < 100 且 JS 命中 > 5，或 JS 命中密度 > 3 次/百字。
+    # 两个条件都只是“命中数超过某个阈值”，数到阈值就停，不用 findall 数完整页。
+    # 阈值最小为 3：命中不超过 3 次的页面直接放行，不必跑整页去标签
+    hits = _JS_PATTERN.finditer(text)
+    js_hits = sum(1 for _ in itertools.islice(hits, _MIN_JS_LIMIT + 1))
+    if js_hits <= _MIN_JS_LIMIT:
+        return False
+    plain_len = len(_TAG_RE.sub('', text).strip())
+    limit = 3 * max(plain_len / 100, 1) if plain_len > 0 else float("inf")
+    if plain_len < 100:
+        limit = min(limit, 5)
+    if js_hits > limit:
         return True
+    for _ in hits:
+        js_hits += 1
+        if js_hits > limit:
+            return True
     return False
 
 
-def _html_to_markdown(html: str) -> str:
-    """用 readability + markdownify 提取正文转 markdown"""
+def _truncate_html(main_html: str, max_chars: int) -> str:
+    """按块丢掉超出 max_chars 的尾部内容（转 markdown 后本来也会被截掉）。
+
+    从正文根节点沿唯一子节点向下，找到第一个有多个子块的容器，按块累计文本长度
+    （空白折叠后，近似 markdown 中的正文长度），超出预算后的块整体删除。
+    """
+    root = lxml_html.fromstring(main_html)
+    node = root
+    while len(node) == 1:
+        node = node[0]
+    total = 0
+    children = list(node)
+    for i, child in enumerate(children):
+        total += len(_WHITESPACE_RE.sub(" ", child.text_content()))
+        if total > max_chars:
+            for extra in children[i + 1:]:
+                node.remove(extra)
+            break
+    return lxml_html.tostring(root, encoding="unicode")
+
+
+def _html_to_markdown(html: str, max_chars: int | None = None) -> str:
+    """用 readability + markdownify 提取正文转 markdown。
+
+    传入 max_chars 且正文 HTML 远大于它时，先丢掉尾部块再转换，避免转换注定被截掉的内容。
+    """
     if not _HAS_READABILITY:
-        return re.sub(r'<[^>]+>', '', html).strip()
-    doc = ReadabilityDoc(html)
-    main_html = doc.summary(html_partial=True)
-    soup = BeautifulSoup(main_html, "lxml")
-    for tag in soup(["script", "style", "noscript"]):
-        tag.decompose()
-    return md_convert(str(soup), heading_style="ATX").strip()
+        return _TAG_RE.sub('', html).strip()
+    # 整页只解析一次（同 readability 内部 build_doc 的 UTF-8 解析方式），把树交给 readability：
+    # 正文过短时它会放宽规则重跑，传入的是树则只 deepcopy，不再重新解析整页
+    root = lxml_html.document_fromstring(
+        html.encode("utf-8", "replace"), parser=_UTF8_PARSER,
+    )
+    main_html = ReadabilityDoc(root).summary(html_partial=True)
+    if max_chars and len(main_html) > _TRUNCATE_RATIO * max_chars:
+        main_html = _truncate_html(main_html, max_chars)
+    # summary 内部已删掉 script/style/noscript，直接交给 markdownify，不再二次建树
+    return md_convert(main_html, heading_style="ATX").strip()
+
+
+def _enhance_line(m: re.Match) -> str:
+    body = m.group("body")
+    if m.group("h2"):
+        return f"## {body}"
+    if m.group("h3"):
+        return f"### {body}"
+    return body.replace("* ", "- ")
 
 
 def enhance_markdown_structure(md_text: str) -> str:
     """
     Enhance Chinese structured headings for better RAG chunking.
     """
-
-    lines = md_text.split("\n")
-    enhanced = []
-
-    for line in lines:
-        stripped = line.strip()
-
-        # 一级标题：一、二、三、
-        if re.match(r"^[一二三四五六七八九十]+、", stripped):
-            enhanced.append(f"## {stripped}")
-
-        # 二级标题：1、2、
-        elif re.match(r"^\d+、", stripped):
-            enhanced.append(f"### {stripped}")
-
-        # 星号列表转普通文本（避免乱层级）
-        elif stripped.startswith("* "):
-            enhanced.append(stripped.replace("* ", "- "))
-
-        else:
-            enhanced.append(line)
-
-    return "\n".join(enhanced)
+    return _HEADING_RE.sub(_enhance_line, md_text)
 
 
 class CrawlEngine:
@@ -150,6 +201,40 @@ class CrawlEngine:
         self.use_readability = use_readability
         self.max_chars = max_chars
         self.jina_api_key = jina_api_key or os.environ.get("JINA_API_KEY", "")
+        # 复用的 HTTP client（懒创建，绑定到创建时的事件循环）
+        self._client: httpx.AsyncClient | None = None
+        self._client_loop = None
+        # 请求合并：同一 URL 的并发 crawl 只跑一条抓取链，其余等待同一个 Task
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        """懒创建 httpx.AsyncClient，L0 与 jina 共用连接池。
+        事件循环变了（如多次 asyncio.run）则重建，旧连接不能跨循环复用。
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                headers=self._HEADERS,
+                http2=True,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def aclose(self) -> None:
+        """关闭复用的 HTTP client。"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._client_loop = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
 
     # ── 主入口 ──
     async def crawl(self, url: str) -> Optional[str]:
@@ -162,6 +247,29 @@ class CrawlEngine:
             logger.info(f"[crawl][cache hit] {url[:80]}")
             return cached
 
+        # ── 同 URL 已在抓取（crawl 或 crawl_many）：等同一个 Task ──
+        task = self._inflight_task(url, lambda: self._crawl_uncached(url, cache_key))
+        # shield：单个调用方被取消不连累其它等待者
+        return await asyncio.shield(task)
+
+    def _inflight_task(self, url: str, make_coro) -> asyncio.Task:
+        """取 url 在飞的 Task，没有则用 make_coro() 新建并登记。
+        单线程事件循环里 get → create_task → 登记之间没有 await，无需加锁。
+        """
+        task = self._inflight.get(url)
+        if task is None:
+            task = asyncio.create_task(make_coro())
+            self._inflight[url] = task
+            # 在 Task 结束时出表，而不是在某个等待者返回时：等待者被取消也不会提前出表
+            task.add_done_callback(
+                lambda t: self._inflight.pop(url, None) if self._inflight.get(url) is t else None
+            )
+        return task
+
+    async def _crawl_uncached(self, url: str, cache_key: str) -> Optional[str]:
+        """crawl 的实际抓取：逐级尝试后端，成功则写缓存（不查缓存）"""
+        cache = get_crawl_cache()
+
         # ── 逐级尝试 ──
         backends = self._build_chain()
         attempted = []
@@ -187,29 +295,125 @@ class CrawlEngine:
         logger.warning(f"[crawl] 所有尝试的后端均失败: {attempted}, url={url}")
         return None
 
+    async def crawl_many(self, urls: list[str]) -> list[Optional[str]]:
+        """批量抓取，返回与 urls 一一对应的 markdown 文本或 None。
+
+        与 crawl 相同的逐级 fallback，但按级整批处理：每一级只处理上一级失败的 URL，
+        requests / jina 级并发执行，crawl4ai 级整批共用一个浏览器实例。
+        重复 URL 只抓一次；已被并发的 crawl / crawl_many 抓取中的 URL 直接等那边的结果，
+        本批新抓的 URL 也登记到在飞表，供之后的调用等待。
+        """
+        cache = get_crawl_cache()
+        fetched: dict[str, Optional[str]] = {}
+
+        # ── 去重 + 查缓存 ──
+        misses = []
+        for url in dict.fromkeys(urls):
+            cached = await cache.get(f"crawl:{url}")
+            if cached is not None:
+                fetched[url] = cached
+            else:
+                misses.append(url)
+        if len(misses) < len(fetched) + len(misses):
+            logger.info(f"[crawl_many][cache hit] {len(fetched)}/{len(fetched) + len(misses)}")
+
+        # ── 未在飞的 URL 由本批整批抓取，逐个登记；已在飞的等原 Task ──
+        # 从这里到登记完没有 await，在飞表不会在中途变化
+        own = [url for url in misses if url not in self._inflight]
+        if own:
+            batch = asyncio.create_task(self._crawl_batch(own))
+            for url in own:
+                self._inflight_task(url, lambda url=url: self._take(batch, url))
+        tasks = [self._inflight[url] for url in misses]
+        for url, text in zip(misses, await asyncio.gather(*map(asyncio.shield, tasks))):
+            fetched[url] = text
+
+        return [fetched[url] for url in urls]
+
+    @staticmethod
+    async def _take(batch: asyncio.Task, url: str) -> Optional[str]:
+        """从整批抓取结果里取单个 URL 的结果"""
+        return (await batch).get(url)
+
+    async def _crawl_batch(self, urls: list[str]) -> dict[str, Optional[str]]:
+        """crawl_many 的实际抓取：按级整批尝试，成功则写缓存（不查缓存、不去重）"""
+        cache = get_crawl_cache()
+        results: dict[str, Optional[str]] = dict.fromkeys(urls)
+
+        pending = urls
+        for name, batch_fn in self._build_batch_chain():
+            if not pending:
+                break
+            start = time.time()
+            try:
+                texts = await batch_fn(pending)
+            except Exception as e:
+                # 整级失败（如浏览器起不来）：本级全部记为失败，继续下一级
+                logger.warning(f"[crawl_many] {name} 异常: {e}")
+                texts = [None] * len(pending)
+            failed = []
+            for url, text in zip(pending, texts):
+                if text:
+                    results[url] = text[:self.max_chars]
+                    await cache.set(f"crawl:{url}", results[url])
+                else:
+                    failed.append(url)
+            elapsed = time.time() - start
+            logger.info(
+                f"[crawl_many] {name}: {len(pending) - len(failed)}/{len(pending)} 成功"
+                f" | ⏱: {elapsed:.2f}s"
+            )
+            pending = failed
+
+        if pending:
+            logger.warning(f"[crawl_many] {len(pending)} 个 URL 所有后端均失败")
+        return results
+
     def _build_chain(self) -> list:
         """根据 level 和可用性构建 fallback 链"""
         chain = [("requests", self._crawl_requests)]
         if self.level >= 1 and _HAS_CRAWL4AI:
             chain.append(("crawl4ai", self._crawl_crawl4ai))
-        if self.level >= 2 and _HAS_HTTPX:
+        if self.level >= 2:
             chain.append(("jina", self._crawl_jina))
         return chain
 
-    # ── L0: requests ──
+    def _build_batch_chain(self) -> list:
+        """crawl_many 用的批量 fallback 链，与 _build_chain 的级别一一对应"""
+        chain = [("requests", self._each(self._crawl_requests))]
+        if self.level >= 1 and _HAS_CRAWL4AI:
+            chain.append(("crawl4ai", self._crawl_crawl4ai_many))
+        if self.level >= 2:
+            chain.append(("jina", self._each(self._crawl_jina)))
+        return chain
+
+    @staticmethod
+    def _each(fn):
+        """把单 URL 后端包装成批量版本：并发执行，异常记为 None"""
+        async def run(url: str) -> Optional[str]:
+            try:
+                return await fn(url)
+            except Exception as e:
+                logger.warning(f"[crawl_many] {url[:80]} 异常: {e}")
+                return None
+
+        async def batch(urls: list[str]) -> list[Optional[str]]:
+            return await asyncio.gather(*(run(u) for u in urls))
+        return batch
+
+    # ── L0: requests（纯 HTTP，异步 httpx） ──
     async def _crawl_requests(self, url: str) -> Optional[str]:
         try:
-            resp = sync_requests.get(
-                url, headers=self._HEADERS, timeout=self.timeout, allow_redirects=True,
-            )
+            client = await self._get_client()
+            resp = await client.get(url)
             if _is_bad_content(resp.text, resp.status_code):
                 return None
             if self.use_readability and _HAS_READABILITY:
-                content = _html_to_markdown(resp.text)
+                content = _html_to_markdown(resp.text, self.max_chars)
                 content = enhance_markdown_structure(content)
                 return content
             # 简单去标签
-            return re.sub(r'<[^>]+>', '', resp.text).strip()
+            return _TAG_RE.sub('', resp.text).strip()
         except Exception as e:
             logger.warning(f"[requests] {e}")
             return None
@@ -222,18 +426,46 @@ class CrawlEngine:
             result = await crawler.arun(url=url)
             return result.markdown if result and result.markdown else None
 
+    async def _crawl_crawl4ai_many(self, urls: list[str]) -> list[Optional[str]]:
+        """crawl4ai 批量抓取：整批共用一个浏览器，新版按内存压力自适应调度 + 限速"""
+        async with AsyncWebCrawler() as crawler:
+            if _HAS_CRAWL4AI_DISPATCHER:
+                dispatcher = MemoryAdaptiveDispatcher(
+                    memory_threshold_percent=75,
+                    rate_limiter=RateLimiter(base_delay=(0.5, 1.5)),
+                )
+                try:
+                    batch = await crawler.arun_many(urls=urls, dispatcher=dispatcher)
+                except Exception as e:
+                    logger.warning(f"[crawl4ai] arun_many 异常: {e}")
+                    return [None] * len(urls)
+                # 调度器按完成顺序返回，按 url 对回输入顺序
+                by_url = {
+                    r.url: r.markdown for r in batch
+                    if r and getattr(r, "success", True) and r.markdown
+                }
+                return [by_url.get(u) for u in urls]
+
+            texts = []
+            for url in urls:
+                try:
+                    result = await crawler.arun(url=url)
+                    texts.append(result.markdown if result and result.markdown else None)
+                except Exception as e:
+                    logger.warning(f"[crawl4ai] {url[:80]} 异常: {e}")
+                    texts.append(None)
+            return texts
+
     # ── L2: jina ──
     async def _crawl_jina(self, url: str) -> Optional[str]:
-        if not _HAS_HTTPX:
-            return None
         headers = {}
         if self.jina_api_key:
             headers["Authorization"] = f"Bearer {self.jina_api_key}"
         target = f"https://r.jina.ai/{url}"
-        async with httpx.AsyncClient(http2=True, timeout=30.0) as client:
-            resp = await client.get(target, headers=headers, follow_redirects=True)
-            resp.raise_for_status()
-            return resp.text if resp.text else None
+        client = await self._get_client()
+        resp = await client.get(target, headers=headers, timeout=30.0)
+        resp.raise_for_status()
+        return resp.text if resp.text else None
 
     # ── 便捷方法 ──
     def available_backends(self) -> list[str]:
@@ -241,8 +473,7 @@ class CrawlEngine:
         backends = ["requests"]
         if _HAS_CRAWL4AI:
             backends.append("crawl4ai")
-        if _HAS_HTTPX:
-            backends.append("jina")
+        backends.append("jina")
         return backends
 
 
@@ -254,6 +485,7 @@ async def main():
     url = "https://www.dayi.org.cn/qa/286155.html"
     url = "https://zhuanlan.zhihu.com/p/56592867" # 动态
     text = await engine.crawl(url)
+    await engine.aclose()
     if text:
         print(text)
     else:
@@ -261,5 +493,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
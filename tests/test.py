@@ -1,12 +1,23 @@
 import asyncio
+import sys
+import time
 from baidu_search import BaiduSearch
+from baidu_search.cache import json_dumps
 
 async def main():
-    query = "强化学习"
-    searcher = BaiduSearch()
-    # results = await searcher.search(query, num_results=10)
-    results = await searcher.search_baidu(query, num_results=10)
+    queries = ["强化学习", "强化学习 入门", "PPO 算法"]
+    # 同一个 searcher 复用连接池，多个 query 在同一个事件循环里并发
+    # cache_dir 单独指定，第一轮走网络（冷），第二轮命中 query 级缓存（热）
+    async with BaiduSearch({"cache_dir": ".cache/test", "cache_ttl": 300}) as searcher:
+        for run in ("cold", "warm"):
+            t0 = time.time()
+            # results = await asyncio.gather(*(searcher.search(q, num_results=10) for q in queries))
+            results = await asyncio.gather(
+                *(searcher.search_baidu(q, num_results=10) for q in queries)
+            )
+            print(f"[{run}] {time.time() - t0:.2f}s")
 
-    print(results)
+    # 整体序列化一次（有 orjson 就走 orjson），一次 write 输出
+    sys.stdout.write(json_dumps(dict(zip(queries, results))) + "\n")
 
-asyncio.run(main())
\ No newline at end of file
+asyncio.run(main())
@@ -0,0 +1,78 @@
+"""测试 BM25 打分与全量 BM25Okapi 一致"""
+import math
+import os
+import random
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import numpy as np
+
+from baidu_search.bm25 import BM25Index
+from baidu_search.compressor import ContextCompressor, _split_and_filter
+
+
+def okapi_scores(corpus, query, k1=1.5, b=0.75, epsilon=0.25):
+    """参考实现：同 rank_bm25.BM25Okapi，纯 Python 逐句打分"""
+    n = len(corpus)
+    avgdl = sum(len(d) for d in corpus) / n
+    df = Counter(t for d in corpus for t in set(d))
+    idf = {t: math.log(n - c + 0.5) - math.log(c + 0.5) for t, c in df.items()}
+    eps = epsilon * sum(idf.values()) / len(idf)
+    idf = {t: (eps if v < 0 else v) for t, v in idf.items()}
+    scores = []
+    for d in corpus:
+        tf = Counter(d)
+        scores.append(sum(
+            idf.get(q, 0) * tf[q] * (k1 + 1) / (tf[q] + k1 * (1 - b + b * len(d) / avgdl))
+            for q in query
+        ))
+    return np.array(scores)
+
+
+def _random_case(rng):
+    vocab = ["强化", "学习", "Agent", "小车", "奖励", "策略", "咖啡", "外卖", "游戏", "算法"]
+    corpus = [
+        [rng.choice(vocab) for _ in range(rng.randint(1, 12))]
+        for _ in range(rng.randint(1, 30))
+    ]
+    query = [rng.choice(vocab) for _ in range(rng.randint(1, 5))]
+    return corpus, query
+
+
+def test_index_matches_okapi():
+    rng = random.Random(0)
+    for _ in range(400):
+        corpus, query = _random_case(rng)
+        np.testing.assert_allclose(
+            BM25Index(corpus).get_scores(query), okapi_scores(corpus, query),
+        )
+
+
+def test_compressor_scores_match_unfiltered_index():
+    rng = random.Random(1)
+    pieces = [
+        "强化学习里的 Agent 通过试错最大化累计奖励。", "我前天点了个外卖。",
+        "CartPole 是最经典的入门例子。", "PPO 稳定又 sample-efficient。",
+        "最近迷上喝冰美式咖啡。", "Q-learning 学到往哪边推小车。",
+    ]
+    queries = ["Agent 强化学习 入门", "咖啡", "PPO 算法", "小车 奖励 Agent"]
+    for tokenizer in ("jieba", "regex"):
+        comp = ContextCompressor(tokenizer=tokenizer)
+        for _ in range(100):
+            text = "".join(rng.choice(pieces) for _ in range(rng.randint(1, 20)))
+            query = rng.choice(queries)
+            sentences = list(_split_and_filter(text, comp.min_sentence_len, comp.splitter))
+            if not sentences:
+                continue
+            corpus = [comp._tokenize(s) for s in sentences]
+            expected = BM25Index(corpus).get_scores(comp._tokenize(query))
+            np.testing.assert_array_equal(comp._bm25_score(query, sentences), expected)
+            np.testing.assert_allclose(expected, okapi_scores(corpus, comp._tokenize(query)))
+
+
+if __name__ == "__main__":
+    test_index_matches_okapi()
+    test_compressor_scores_match_unfiltered_index()
+    print("ok")
@@ -0,0 +1,93 @@
+"""测试 async_cache 的 single-flight：发起者被取消不影响其它等待者"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from baidu_search.cache import AsyncCacheManager, async_cache
+
+
+def test_leader_cancel_does_not_cancel_follower():
+    async def main():
+        cache = AsyncCacheManager()  # 纯内存
+        calls = 0
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        @async_cache(cache=cache)
+        async def slow(x):
+            nonlocal calls
+            calls += 1
+            started.set()
+            await release.wait()
+            return x * 2
+
+        leader = asyncio.create_task(slow(21))
+        await started.wait()
+        follower = asyncio.create_task(slow(21))
+        await asyncio.sleep(0)  # 让 follower 挂到同一个在飞 Task 上
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        assert leader.cancelled() or leader.done()
+
+        release.set()
+        assert await follower == 42
+        assert calls == 1
+        # 原函数跑完照常写缓存，在飞表已清空
+        assert await slow(21) == 42
+        assert calls == 1
+        assert not cache._inflight
+
+    asyncio.run(main())
+
+
+def test_concurrent_misses_run_once_and_share_errors():
+    async def main():
+        cache = AsyncCacheManager()
+        calls = 0
+
+        @async_cache(cache=cache)
+        async def boom(x):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            raise ValueError(x)
+
+        results = await asyncio.gather(*(boom(1) for _ in range(5)), return_exceptions=True)
+        assert calls == 1
+        assert all(isinstance(r, ValueError) for r in results)
+        assert not cache._inflight
+
+    asyncio.run(main())
+
+
+def test_default_ttl_applies_to_decorated_entries():
+    async def main():
+        cache = AsyncCacheManager(default_ttl=60)
+        calls = 0
+
+        @async_cache(cache=cache)
+        async def f(x):
+            nonlocal calls
+            calls += 1
+            return x
+
+        await f(1)
+        await f(1)
+        assert calls == 1
+        # 条目超过 default_ttl 后应重新计算，而不是永不过期
+        for entry in cache._memory.values():
+            entry["ts"] -= 61
+        await f(1)
+        assert calls == 2
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    test_leader_cancel_does_not_cancel_follower()
+    test_concurrent_misses_run_once_and_share_errors()
+    test_default_ttl_applies_to_decorated_entries()
+    print("ok")
@@ -0,0 +1,68 @@
+"""测试 crawl_many 的去重：批内重复 URL、与并发 crawl 重叠的 URL 都只抓一次"""
+import asyncio
+import os
+import sys
+import uuid
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from baidu_search.crawl import CrawlEngine
+
+
+def _engine(calls: Counter) -> CrawlEngine:
+    async def fake_requests(url):
+        calls[url] += 1
+        await asyncio.sleep(0.02)
+        return None if "bad" in url else f"page of {url}"
+
+    engine = CrawlEngine(level=0)
+    engine._crawl_requests = fake_requests
+    return engine
+
+
+def test_crawl_many_dedupes_with_inflight():
+    async def main():
+        # 每次运行用新 URL，避免命中上次留下的磁盘缓存
+        tag = uuid.uuid4().hex
+        a, b, bad = (f"http://{name}.{tag}.test/" for name in ("a", "b", "bad"))
+        calls = Counter()
+        engine = _engine(calls)
+
+        single = asyncio.create_task(engine.crawl(a))
+        await asyncio.sleep(0)  # 让 crawl(a) 先登记到在飞表
+        batch, single_text, later_text = await asyncio.gather(
+            engine.crawl_many([a, b, b, bad, a]), single, engine.crawl(b),
+        )
+
+        assert batch == [f"page of {a}", f"page of {b}", f"page of {b}", None, f"page of {a}"]
+        assert single_text == later_text.replace(b, a)
+        assert calls == Counter({a: 1, b: 1, bad: 1})
+        assert not engine._inflight
+
+    asyncio.run(main())
+
+
+def test_crawl_many_level_error_falls_through():
+    async def main():
+        tag = uuid.uuid4().hex
+        urls = [f"http://{name}.{tag}.test/" for name in ("a", "b")]
+        calls = Counter()
+        engine = _engine(calls)
+        fallback = engine._build_batch_chain()
+
+        async def broken(_urls):
+            raise RuntimeError("browser failed to launch")
+
+        # 第一级整批抛错，应记为失败并交给下一级
+        engine._build_batch_chain = lambda: [("broken", broken)] + fallback
+        assert await engine.crawl_many(urls) == [f"page of {u}" for u in urls]
+        assert calls == Counter(urls)
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    test_crawl_many_dedupes_with_inflight()
+    test_crawl_many_level_error_falls_through()
+    print("ok")